@@ -0,0 +1,71 @@
+"""
+Migration: create the indexes declared on the models in app.py.
+
+db.create_all() only creates missing tables, so databases created before
+the indexes were added need this script. Duplicate favorites are removed
+first (keeping the oldest) so the unique (user_email, meme_id) index can
+be built. Safe to run more than once; existing indexes are skipped.
+
+Run this on PythonAnywhere console or locally, then check the result with:
+    python audit_indexes.py
+"""
+
+import os
+import sys
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db
+
+
+def remove_duplicate_favorites():
+    """Keep the first favorite per (user_email, meme_id)"""
+    result = db.session.execute(db.text("""
+        DELETE FROM favorite
+        WHERE id NOT IN (
+            SELECT keep_id FROM (
+                SELECT MIN(id) AS keep_id FROM favorite GROUP BY user_email, meme_id
+            ) AS keep
+        )
+    """))
+    db.session.commit()
+    print(f"✅ Removed {result.rowcount} duplicate favorites")
+
+
+def create_indexes():
+    existing_tables = set(db.inspect(db.engine).get_table_names())
+    created = 0
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            print(f"⚠️  Table {table.name} doesn't exist yet, skipping (it gets its indexes on creation)")
+            continue
+
+        existing = {ix['name'] for ix in db.inspect(db.engine).get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda ix: ix.name):
+            if index.name in existing:
+                print(f"   {index.name} already exists")
+                continue
+            index.create(bind=db.engine)
+            created += 1
+            print(f"✅ Created {index.name} on {table.name}({', '.join(c.name for c in index.columns)})")
+
+    return created
+
+
+if __name__ == '__main__':
+    print("=" * 50)
+    print("Add Missing Indexes")
+    print("=" * 50)
+
+    with app.app_context():
+        try:
+            remove_duplicate_favorites()
+            created = create_indexes()
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Migration failed: {e}")
+            sys.exit(1)
+
+    print(f"\n✅ Migration complete! Created {created} indexes")
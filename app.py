@@ -1,14 +1,38 @@
-from flask import Flask, request, jsonify, send_from_directory, Response, session, redirect, url_for
+from flask import Flask, request, jsonify, send_file, Response, session, redirect, url_for, abort
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from authlib.integrations.flask_client import OAuth
 from dotenv import load_dotenv
-import requests
 import os
 import html
 import secrets
 import random
-from datetime import datetime
+import json
+import base64
+import threading
+import concurrent.futures
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlparse, urlencode
+from collections import defaultdict
+from meme_ingest import MemeIngestor
+from meme_dedup import CrossSourceDeduper, unique_memes
+from feed_ranking import FeedRanker, favorite_segment
+from swr_cache import SWRCache
+from http_client import http_get, iter_content_and_close
+from meme_fanout import fan_out_list
+from quiz_pool import QuizQuestionPool
+from media_store import create_media_store, decode_data_url, content_type_for_key, MediaError
+from image_pipeline import ImagePipeline
+from perceptual_hash import HashPool, BKTree, NEAR_DUPLICATE_DISTANCE
+from write_behind import WriteBehindBuffer
+from proxy_cache import ProxyCache, parse_range, slice_chunks
+from proxy_governor import ConcurrencyGovernor, GovernorBusy
+from static_assets import StaticManifest, serve_file
+from response_cache import ResponseCache
+from json_provider import FastJSONProvider
+from compression import CompressionMiddleware
 
 # Load environment variables from .env file
 load_dotenv()
@@ -16,7 +40,17 @@ load_dotenv()
 # Allow OAuth over HTTP for localhost
 os.environ['AUTHLIB_INSECURE_TRANSPORT'] = '1'
 
-app = Flask(__name__, static_url_path='', static_folder='.')
+app = Flask(__name__, static_folder=None)
+# orjson-backed jsonify; datetimes serialize as ISO 8601
+app.json = FastJSONProvider(app)
+# Negotiated br/zstd/gzip for text responses above the size threshold
+compression = CompressionMiddleware(
+    app.wsgi_app,
+    min_size=int(os.environ.get('COMPRESSION_MIN_BYTES', '1024')),
+    buffer_limit=int(os.environ.get('COMPRESSION_BUFFER_LIMIT', str(1024 * 1024)))
+)
+if os.environ.get('COMPRESSION_ENABLED', 'true').lower() == 'true':
+    app.wsgi_app = compression
 
 # Configuration
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production')
@@ -52,6 +86,34 @@ app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
     'pool_pre_ping': True,
 }
 
+# Media Storage Configuration (user-posted meme images)
+app.config['MEDIA_BACKEND'] = os.environ.get('MEDIA_BACKEND', 'local')
+app.config['MEDIA_ROOT'] = os.environ.get('MEDIA_ROOT', os.path.join(app.root_path, 'media'))
+app.config['MAX_MEME_BYTES'] = int(os.environ.get('MAX_MEME_BYTES', str(10 * 1024 * 1024)))
+
+# Perceptual hashing (near-duplicate detection)
+PHASH_WORKERS = int(os.environ.get('PHASH_WORKERS', '2'))
+PHASH_UPLOAD_TIMEOUT = float(os.environ.get('PHASH_UPLOAD_TIMEOUT', '3'))
+PHASH_NEAR_DISTANCE = int(os.environ.get('PHASH_NEAR_DISTANCE', str(NEAR_DUPLICATE_DISTANCE)))
+# Hashing ingested memes downloads every image once, so it is opt-in
+MEME_PHASH_INGEST = os.environ.get('MEME_PHASH_INGEST', '0') == '1'
+PHASH_INGEST_DEADLINE = float(os.environ.get('PHASH_INGEST_DEADLINE', '10'))
+PHASH_MAX_DOWNLOAD_BYTES = 5 * 1024 * 1024
+# Ingest image downloads get their own threads, away from the request-path fan-out pool
+PHASH_DOWNLOAD_WORKERS = int(os.environ.get('PHASH_DOWNLOAD_WORKERS', '4'))
+
+# Media proxy cache (/api/proxy-audio, /api/download-proxy)
+app.config['PROXY_CACHE_DIR'] = os.environ.get('PROXY_CACHE_DIR', os.path.join(app.root_path, 'proxy_cache'))
+app.config['PROXY_CACHE_MAX_BYTES'] = int(os.environ.get('PROXY_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+app.config['PROXY_CACHE_MAX_OBJECT_BYTES'] = int(os.environ.get('PROXY_CACHE_MAX_OBJECT_BYTES', str(50 * 1024 * 1024)))
+PROXY_CACHE_MAX_AGE = int(os.environ.get('PROXY_CACHE_MAX_AGE', '86400'))
+
+# Proxy concurrency limits (per process; keep PROXY_MAX_INFLIGHT below gunicorn --threads)
+PROXY_MAX_INFLIGHT = int(os.environ.get('PROXY_MAX_INFLIGHT', '4'))
+PROXY_MAX_PER_HOST = int(os.environ.get('PROXY_MAX_PER_HOST', '2'))
+PROXY_MAX_QUEUE = int(os.environ.get('PROXY_MAX_QUEUE', '4'))
+PROXY_MAX_WAIT = float(os.environ.get('PROXY_MAX_WAIT', '2'))
+
 # Session Configuration
 app.config['SESSION_COOKIE_SECURE'] = True  # Require HTTPS in production
 app.config['SESSION_COOKIE_HTTPONLY'] = True
@@ -72,6 +134,19 @@ app.config['GOOGLE_CLIENT_SECRET'] = os.environ.get('GOOGLE_CLIENT_SECRET', 'YOU
 
 # Initialize extensions
 db = SQLAlchemy(app)
+media_store = create_media_store(app.config['MEDIA_BACKEND'], root=app.config['MEDIA_ROOT'])
+hash_pool = HashPool(max_workers=PHASH_WORKERS)
+proxy_cache = ProxyCache(
+    app.config['PROXY_CACHE_DIR'],
+    max_bytes=app.config['PROXY_CACHE_MAX_BYTES'],
+    max_object_bytes=app.config['PROXY_CACHE_MAX_OBJECT_BYTES']
+)
+proxy_governor = ConcurrencyGovernor(
+    max_inflight=PROXY_MAX_INFLIGHT,
+    max_per_host=PROXY_MAX_PER_HOST,
+    max_queue=PROXY_MAX_QUEUE,
+    max_wait=PROXY_MAX_WAIT
+)
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
 oauth = OAuth(app)
@@ -111,6 +186,13 @@ class Favorite(db.Model):
     is_video = db.Column(db.Boolean, default=False)
     source = db.Column(db.String(50))
     saved_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # add_favorite()/remove_favorite_by_meme() lookups; also stops duplicate saves
+        db.Index('ix_favorite_user_meme', 'user_email', 'meme_id', unique=True),
+        # get_favorites() keyset pagination
+        db.Index('ix_favorite_user_saved', 'user_email', 'saved_at', 'id'),
+    )
 
 class LoginHistory(db.Model):
     __tablename__ = 'login_history'
@@ -133,11 +215,30 @@ class UserMeme(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_email = db.Column(db.String(120), db.ForeignKey('user.email'), nullable=False)
     title = db.Column(db.String(500))
-    image_data = db.Column(db.Text, nullable=False)  # Base64 encoded image
+    image_data = db.Column(db.Text, nullable=False, default='')  # Legacy base64 data URL, empty once moved to media store
+    image_key = db.Column(db.String(100), index=True)  # Media store key of the original upload
+    full_key = db.Column(db.String(100))  # Compressed full-size variant
+    thumb_key = db.Column(db.String(100))  # Grid thumbnail variant
+    phash = db.Column(db.String(16))  # Perceptual hash for near-duplicate checks
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     upvotes = db.Column(db.Integer, default=0)
     
     user = db.relationship('User', backref='memes')
+    
+    __table_args__ = (
+        # get_user_memes() keyset pagination
+        db.Index('ix_user_memes_created_id', 'created_at', 'id'),
+        db.Index('ix_user_memes_user_email', 'user_email'),
+    )
+    
+    @property
+    def image_url(self):
+        key = self.full_key or self.image_key
+        return media_store.url(key) if key else self.image_data
+    
+    @property
+    def thumbnail_url(self):
+        return media_store.url(self.thumb_key) if self.thumb_key else self.image_url
 
 class Comment(db.Model):
     __tablename__ = 'comments'
@@ -149,6 +250,11 @@ class Comment(db.Model):
     
     user = db.relationship('User', backref='comments')
     meme = db.relationship('UserMeme', backref='comments')
+    
+    __table_args__ = (
+        # handle_comments() listing and get_user_memes() comment counts
+        db.Index('ix_comments_meme_created', 'meme_id', 'created_at', 'id'),
+    )
 
 class Upvote(db.Model):
     __tablename__ = 'upvotes'
@@ -158,7 +264,10 @@ class Upvote(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Unique constraint to prevent double voting
-    __table_args__ = (db.UniqueConstraint('user_email', 'meme_id', name='_user_meme_uc'),)
+    __table_args__ = (
+        db.UniqueConstraint('user_email', 'meme_id', name='_user_meme_uc'),
+        db.Index('ix_upvotes_meme_id', 'meme_id'),
+    )
 
 class QuizScore(db.Model):
     __tablename__ = 'quiz_scores'
@@ -168,6 +277,27 @@ class QuizScore(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     user = db.relationship('User', backref='scores')
+    
+    __table_args__ = (
+        db.Index('ix_quiz_scores_user_score', 'user_email', 'score'),
+    )
+
+class LeaderboardStat(db.Model):
+    """Per-user leaderboard totals, maintained incrementally for each period"""
+    __tablename__ = 'leaderboard_stats'
+    user_email = db.Column(db.String(120), db.ForeignKey('user.email'), primary_key=True)
+    period = db.Column(db.String(16), primary_key=True)  # 'all', 'day:2025-01-31', 'week:2025-W05'
+    best_score = db.Column(db.Integer, nullable=False, default=0)
+    total_upvotes = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    user = db.relationship('User')
+    
+    # Top-k reads walk these indexes instead of aggregating raw tables
+    __table_args__ = (
+        db.Index('ix_leaderboard_period_score', 'period', 'best_score'),
+        db.Index('ix_leaderboard_period_upvotes', 'period', 'total_upvotes'),
+    )
 
 @login_manager.user_loader
 def load_user(user_email):
@@ -193,14 +323,161 @@ with app.app_context():
             print(f"⚠️  Database initialization warning: {str(e)}")
             print("   App will continue, but some features may not work.")
 
+# Schema capabilities & feature flags
+# Table and column existence is read once at startup (and on the admin refresh
+# hook) so routes can check it with a set lookup instead of introspecting the database.
+SCHEMA_TABLES = frozenset()
+SCHEMA_COLUMNS = {}  # table -> frozenset of column names, for FEATURE_COLUMNS tables
+
+# Tables each optional feature needs
+FEATURE_TABLES = {
+    'community': ('user_memes',),
+    'comments': ('user_memes', 'comments'),
+    'upvotes': ('user_memes', 'upvotes'),
+    'leaderboard': ('quiz_scores', 'leaderboard_stats'),
+    'login_history': ('login_history',),
+}
+
+# Columns added to existing tables by migrate.py; create_all() won't add them
+FEATURE_COLUMNS = {
+    'community': {'user_memes': ('image_key', 'full_key', 'thumb_key', 'phash')},
+}
+
+# Features switched off by config, e.g. DISABLED_FEATURES=community,comments
+CONFIG_DISABLED_FEATURES = frozenset(f.strip() for f in os.environ.get('DISABLED_FEATURES', '').split(',') if f.strip())
+DISABLED_FEATURES = set(CONFIG_DISABLED_FEATURES)
+
+# Admin toggles and schema refreshes are written here so every worker picks
+# them up on its next request, not just the one that served the admin call
+FEATURE_OVERRIDES_FILE = os.environ.get('FEATURE_OVERRIDES_FILE', os.path.join(app.instance_path, 'feature_overrides.json'))
+feature_overrides_lock = threading.Lock()
+feature_overrides_seen = {'mtime': None, 'schema_refreshed_at': None}
+
+def refresh_schema_capabilities():
+    """Re-read which tables exist (call after running a migration)"""
+    global SCHEMA_TABLES, SCHEMA_COLUMNS
+    try:
+        with app.app_context():
+            inspector = db.inspect(db.engine)
+            tables = frozenset(inspector.get_table_names())
+            columns = {}
+            for required in FEATURE_COLUMNS.values():
+                for table in required:
+                    if table in tables and table not in columns:
+                        columns[table] = frozenset(c['name'] for c in inspector.get_columns(table))
+        SCHEMA_TABLES, SCHEMA_COLUMNS = tables, columns
+    except Exception as e:
+        print(f"⚠️  Could not read database schema: {e}")
+        return SCHEMA_TABLES
+    
+    for name, required in FEATURE_COLUMNS.items():
+        for table, table_columns in required.items():
+            missing = [c for c in table_columns if table in SCHEMA_COLUMNS and c not in SCHEMA_COLUMNS[table]]
+            if missing:
+                print(f"⚠️  {table} is missing {', '.join(missing)}; '{name}' is off until you run migrate.py")
+    return SCHEMA_TABLES
+
+def feature_enabled(name):
+    """O(1) check that a feature is switched on and its tables exist"""
+    if name in DISABLED_FEATURES:
+        return False
+    if not all(table in SCHEMA_TABLES for table in FEATURE_TABLES.get(name, ())):
+        return False
+    return all(
+        column in SCHEMA_COLUMNS.get(table, ())
+        for table, columns in FEATURE_COLUMNS.get(name, {}).items()
+        for column in columns
+    )
+
+def feature_status():
+    return {name: feature_enabled(name) for name in FEATURE_TABLES}
+
+def read_feature_overrides():
+    try:
+        with open(FEATURE_OVERRIDES_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_feature_overrides(update):
+    """Merge update into the shared overrides file and apply it here"""
+    with feature_overrides_lock:
+        overrides = read_feature_overrides()
+        overrides.update(update)
+        os.makedirs(os.path.dirname(FEATURE_OVERRIDES_FILE), exist_ok=True)
+        tmp_path = FEATURE_OVERRIDES_FILE + '.part'
+        with open(tmp_path, 'w') as f:
+            json.dump(overrides, f)
+        os.replace(tmp_path, FEATURE_OVERRIDES_FILE)
+    sync_feature_overrides()
+
+def sync_feature_overrides():
+    """Apply the overrides file if it changed since this worker last read it (one stat)"""
+    try:
+        mtime = os.stat(FEATURE_OVERRIDES_FILE).st_mtime_ns
+    except OSError:
+        mtime = None
+    if mtime == feature_overrides_seen['mtime']:
+        return
+    
+    with feature_overrides_lock:
+        feature_overrides_seen['mtime'] = mtime
+        overrides = read_feature_overrides()
+        disabled = CONFIG_DISABLED_FEATURES.union(overrides.get('disabled', ())).difference(overrides.get('enabled', ()))
+        DISABLED_FEATURES.clear()
+        DISABLED_FEATURES.update(disabled)
+        refreshed_at = overrides.get('schema_refreshed_at')
+        refresh = refreshed_at != feature_overrides_seen['schema_refreshed_at']
+        feature_overrides_seen['schema_refreshed_at'] = refreshed_at
+    if refresh and refreshed_at is not None:
+        refresh_schema_capabilities()
+
+refresh_schema_capabilities()
+# Just read at startup; only later refresh requests need another pass
+feature_overrides_seen['schema_refreshed_at'] = read_feature_overrides().get('schema_refreshed_at')
+sync_feature_overrides()
+
+@app.before_request
+def apply_feature_overrides():
+    sync_feature_overrides()
+
+def require_admin():
+    """Admin hooks are only reachable with the ADMIN_TOKEN header"""
+    token = os.environ.get('ADMIN_TOKEN')
+    return bool(token) and secrets.compare_digest(request.headers.get('X-Admin-Token', ''), token)
+
+# Static files: served only from these directories, via manifests built at startup.
+# dist/ holds the output of build_assets.py; static/ the source files (fallback).
+STATIC_DIR = os.path.join(app.root_path, 'static')
+ASSET_DIST_DIR = os.path.join(app.root_path, 'dist')
+IMMUTABLE_MAX_AGE = 31536000
+
+static_manifest = StaticManifest(STATIC_DIR)
+dist_manifest = StaticManifest(ASSET_DIST_DIR)
+print(f"✅ Static manifest: {len(static_manifest)} files ({len(dist_manifest)} built)")
+
+def send_static_entry(entry, cache_control):
+    if entry is None:
+        abort(404)
+    return serve_file(entry, request, app.response_class, cache_control)
+
 # Routes
 @app.route('/')
 def index():
-    return send_from_directory('.', 'index.html')
+    # Revalidate every visit; an unchanged page costs a 304
+    entry = dist_manifest.get('index.html') or static_manifest.get('index.html')
+    return send_static_entry(entry, 'no-cache')
+
+@app.route('/assets/<path:filename>')
+def serve_asset(filename):
+    """Fingerprinted assets never change, so clients may cache them forever"""
+    entry = dist_manifest.get('assets/' + filename)
+    return send_static_entry(entry, f'public, max-age={IMMUTABLE_MAX_AGE}, immutable')
 
 @app.route('/<path:path>')
 def serve_static(path):
-    return send_from_directory('.', path)
+    """Files in static/ only; anything else is a 404 without a filesystem lookup"""
+    return send_static_entry(static_manifest.get(path), 'no-cache')
 
 # Auth Routes
 @app.route('/login/google')
@@ -243,20 +520,19 @@ def authorize_google():
         session.permanent = True
         session['user_email'] = user.email
         
-        # Record login history (if table exists)
-        try:
-            login_record = LoginHistory(
-                user_email=user.email,
-                ip_address=request.headers.get('X-Forwarded-For', request.remote_addr),
-                user_agent=request.headers.get('User-Agent', 'Unknown'),
-                login_method='google'
-            )
-            db.session.add(login_record)
-            db.session.commit()
-            print(f"✅ User {user.email} logged in successfully! Login recorded.")
-        except Exception as login_history_error:
-            # If login history fails, don't block the login
-            print(f"⚠️  Login successful but history not recorded: {login_history_error}")
+        # Record login history (if table exists) via the write-behind buffer,
+        # so the login itself only pays for the user upsert commit
+        if feature_enabled('login_history'):
+            write_buffer.add('login_history', {
+                'user_email': user.email,
+                'login_time': datetime.utcnow(),
+                'ip_address': (request.headers.get('X-Forwarded-For', request.remote_addr) or '')[:45],
+                'user_agent': request.headers.get('User-Agent', 'Unknown')[:500],
+                'login_method': 'google'
+            })
+            print(f"✅ User {user.email} logged in successfully! Login queued for history.")
+        else:
+            print("⚠️  Login successful but history not recorded: login history is not available")
             print(f"✅ User {user.email} logged in successfully!")
         
         return redirect('/')
@@ -266,6 +542,108 @@ def authorize_google():
         print(f"OAuth Error: {error_msg}")
         return redirect(f'/?error={error_msg}')
 
+# Hot-path queries
+# Built in one place so audit_indexes.py EXPLAINs exactly what the routes run.
+def favorites_query(user_email):
+    return Favorite.query.filter_by(user_email=user_email)
+
+def favorite_lookup_query(user_email, meme_id):
+    return Favorite.query.filter_by(user_email=user_email, meme_id=meme_id)
+
+def user_memes_query():
+    return UserMeme.query.options(db.joinedload(UserMeme.user))
+
+def comment_counts_query(meme_ids):
+    return db.session.query(Comment.meme_id, db.func.count(Comment.id)) \
+        .filter(Comment.meme_id.in_(meme_ids)) \
+        .group_by(Comment.meme_id)
+
+def upvoted_ids_query(user_email, meme_ids):
+    return db.session.query(Upvote.meme_id) \
+        .filter(Upvote.user_email == user_email, Upvote.meme_id.in_(meme_ids))
+
+def comments_query(meme_id):
+    return Comment.query.filter_by(meme_id=meme_id).options(db.joinedload(Comment.user))
+
+def upvote_query(user_email, meme_id):
+    return Upvote.query.filter_by(user_email=user_email, meme_id=meme_id)
+
+def leaderboard_top_query(period, column, limit=10):
+    """Top rows of a leaderboard period by column (best_score or total_upvotes)"""
+    return LeaderboardStat.query.options(db.joinedload(LeaderboardStat.user)) \
+        .filter_by(period=period) \
+        .filter(column > 0) \
+        .order_by(column.desc()) \
+        .limit(limit)
+
+# Keyset (cursor) pagination
+# Lists are ordered newest first by (timestamp, id); the opaque cursor encodes
+# the last row's pair so the next page is a range scan, not an OFFSET.
+def encode_cursor(timestamp, row_id):
+    raw = json.dumps([timestamp.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+def page_query(query, time_column, id_column, limit, after=None):
+    """One page of query, newest first, starting after the (timestamp, id) pair if given"""
+    # Rows without a timestamp can't be ordered or put in a cursor (migrate.py backfills them)
+    query = query.filter(time_column.isnot(None))
+    if after:
+        timestamp, row_id = after
+        query = query.filter(db.or_(
+            time_column < timestamp,
+            db.and_(time_column == timestamp, id_column < row_id)
+        ))
+    # One extra row tells whether there is a next page
+    return query.order_by(time_column.desc(), id_column.desc()).limit(limit + 1)
+
+def paginate(query, time_column, id_column, default_limit=50, max_limit=100):
+    """Apply ?cursor=&limit= to query; returns (rows, next_cursor or None)"""
+    limit = max(1, min(request.args.get('limit', default_limit, type=int), max_limit))
+    cursor = request.args.get('cursor')
+    after = decode_cursor(cursor) if cursor else None
+    
+    rows = page_query(query, time_column, id_column, limit, after).all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, time_column.key), getattr(last, id_column.key))
+    return rows, next_cursor
+
+def paginated_response(items, next_cursor):
+    """JSON list response with the next page cursor in X-Next-Cursor / Link headers"""
+    response = jsonify(items)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+        params = {'cursor': next_cursor}
+        if 'limit' in request.args:
+            params['limit'] = request.args['limit']
+        response.headers['Link'] = f'<{request.base_url}?{urlencode(params)}>; rel="next"'
+    return response
+
+# Rendered JSON for read-mostly endpoints; writes bump the resources they touch
+response_cache = ResponseCache(
+    ttl=float(os.environ.get('RESPONSE_CACHE_TTL', '5')),
+    max_entries=int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', '512'))
+)
+API_CACHE_MAX_AGE = int(os.environ.get('API_CACHE_MAX_AGE', '10'))
+API_CACHE_S_MAXAGE = int(os.environ.get('API_CACHE_S_MAXAGE', '30'))
+
+def session_user_key():
+    """Cache key for responses that differ per signed-in user"""
+    if current_user.is_authenticated:
+        return current_user.email
+    return session.get('user_email')
+
 def get_user_from_token():
     """Fallback for API requests - check both session and current_user"""
     if current_user.is_authenticated:
@@ -332,16 +710,24 @@ def get_favorites():
     if not user:
         return jsonify({'error': 'Unauthorized'}), 401
         
-    favorites = Favorite.query.filter_by(user_email=user.email).order_by(Favorite.saved_at.desc()).all()
-    return jsonify([{
+    try:
+        favorites, next_cursor = paginate(
+            favorites_query(user.email),
+            Favorite.saved_at, Favorite.id,
+            default_limit=100, max_limit=500
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return paginated_response([{
         'id': fav.id,
         'meme_id': fav.meme_id,
         'title': fav.meme_title,
         'url': fav.meme_url,
         'is_video': fav.is_video,
         'source': fav.source,
-        'saved_at': fav.saved_at.isoformat()
-    } for fav in favorites])
+        'saved_at': fav.saved_at
+    } for fav in favorites], next_cursor)
 
 @app.route('/api/favorites', methods=['POST'])
 def add_favorite():
@@ -351,10 +737,7 @@ def add_favorite():
         
     data = request.json
     
-    existing = Favorite.query.filter_by(
-        user_email=user.email,
-        meme_id=data.get('meme_id')
-    ).first()
+    existing = favorite_lookup_query(user.email, data.get('meme_id')).first()
     
     if existing:
         return jsonify({'message': 'Already in favorites'}), 200
@@ -369,7 +752,15 @@ def add_favorite():
     )
     
     db.session.add(favorite)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Saved concurrently; ix_favorite_user_meme keeps a single row
+        db.session.rollback()
+        return jsonify({'message': 'Already in favorites'}), 200
+    
+    # Source affinity for feed ranking may have changed
+    feed_segment_cache.invalidate(user.email)
     
     return jsonify({'message': 'Added to favorites', 'id': favorite.id}), 201
 
@@ -386,6 +777,7 @@ def remove_favorite(fav_id):
     
     db.session.delete(favorite)
     db.session.commit()
+    feed_segment_cache.invalidate(user.email)
     
     return jsonify({'message': 'Removed from favorites'})
 
@@ -401,13 +793,14 @@ def remove_favorite_by_meme():
     if not meme_id:
         return jsonify({'error': 'meme_id required'}), 400
     
-    favorite = Favorite.query.filter_by(user_email=user.email, meme_id=meme_id).first()
+    favorite = favorite_lookup_query(user.email, meme_id).first()
     
     if not favorite:
         return jsonify({'error': 'Favorite not found'}), 404
     
     db.session.delete(favorite)
     db.session.commit()
+    feed_segment_cache.invalidate(user.email)
     
     return jsonify({'message': 'Removed from favorites'})
 
@@ -426,33 +819,50 @@ QUIZ_CATEGORIES = {
     'Mythology': ['hindumemes', 'mythologymemes', 'MythologyMemes']
 }
 
+def fetch_quiz_batch(subreddit, count):
+    """Bulk-fetch quiz candidates from one subreddit for the question pool"""
+    response = http_get(f"https://meme-api.com/gimme/{subreddit}/{count}", source='meme-api')
+    response.raise_for_status()
+    data = response.json()
+    
+    # API returns either a list or a single meme
+    posts = data.get('memes', []) if 'memes' in data else ([data] if 'url' in data else [])
+    
+    return [{
+        'id': post.get('postLink') or post.get('url'),
+        'url': post.get('url'),
+        'title': post.get('title')
+    } for post in posts if post.get('url') and not post.get('nsfw')]
+
+QUIZ_POOL_COLD_START_WAIT = float(os.environ.get('QUIZ_POOL_COLD_START_WAIT', '5'))
+
+quiz_pool = QuizQuestionPool(
+    QUIZ_CATEGORIES,
+    fetch_quiz_batch,
+    batch_size=int(os.environ.get('QUIZ_POOL_BATCH_SIZE', '50')),
+    low_watermark=int(os.environ.get('QUIZ_POOL_LOW_WATERMARK', '15'))
+)
+
+def quiz_session_key():
+    """Stable per-player key used to avoid repeating memes within a session"""
+    if 'quiz_sid' not in session:
+        session['quiz_sid'] = secrets.token_hex(8)
+    return session['quiz_sid']
+
 @app.route('/api/quiz/question', methods=['GET'])
 def get_quiz_question():
     try:
-        # 1. Pick a correct category
-        correct_category = random.choice(list(QUIZ_CATEGORIES.keys()))
-        
-        # 2. Pick a subreddit from that category
-        subreddit = random.choice(QUIZ_CATEGORIES[correct_category])
+        quiz_pool.start()
+        session_key = quiz_session_key()
         
-        # 3. Fetch meme from this subreddit
-        url = f"https://meme-api.com/gimme/{subreddit}/1"
-        response = requests.get(url, timeout=5)
-        
-        if response.status_code != 200:
+        # 1. Take an unseen meme (and its correct category) from the pre-warmed pool
+        picked = quiz_pool.next_question(session_key, timeout=QUIZ_POOL_COLD_START_WAIT)
+        if picked is None:
             return jsonify({'error': 'Failed to fetch memes'}), 500
-            
-        data = response.json()
         
-        # If API returns error or no memes
-        if 'memes' in data and len(data['memes']) > 0:
-            post = data['memes'][0]
-        elif 'url' in data: # Single meme response format
-            post = data
-        else:
-             return jsonify({'error': 'Invalid API response'}), 500
+        correct_category, post = picked
 
-        # 4. Prepare distractors (other categories)
+        # 2. Prepare distractors (other categories)
         all_categories = list(QUIZ_CATEGORIES.keys())
         all_categories.remove(correct_category)
         distractors = random.sample(all_categories, 3)
@@ -475,14 +885,136 @@ def get_quiz_question():
 # Meme Routes
 @app.route('/api/trending-memes', methods=['GET'])
 def get_trending_memes():
-    all_memes = []
-    all_memes.extend(fetch_reddit_memes())
-    all_memes.extend(fetch_imgur_memes())
+    # Both sources run concurrently; whatever misses the deadline is skipped
+    all_memes = fan_out_list({
+        'Reddit': fetch_reddit_memes,
+        'Meme API': fetch_imgur_memes,
+    }, deadline=MEME_FANOUT_DEADLINE, group='trending')
     
-    import random
-    random.shuffle(all_memes)
+    all_memes = unique_memes(all_memes)
+    segment, affinity = feed_segment()
     
-    return jsonify(all_memes[:50])
+    return jsonify(feed_ranker.rank(all_memes, 50, segment=segment, affinity=affinity))
+
+# Upstream request headers for the proxies (shared with the ASGI proxies in asgi.py).
+# Identity encoding keeps upstream Content-Length in step with the bytes we relay.
+DOWNLOAD_PROXY_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept-Encoding': 'identity'
+}
+AUDIO_PROXY_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
+    'Referer': 'https://www.reddit.com/',
+    'Accept-Encoding': 'identity'
+}
+
+def proxy_media(url, source, headers, default_type, download_name=None):
+    """Serve an upstream file through the on-disk proxy cache.
+    
+    Cache hits are served locally with Range (206) and ETag/304 support.
+    Misses stream straight from upstream and are teed into the cache. A
+    Range miss (media players always send one) still fetches the whole
+    object so it can be cached, and only the requested bytes go to the
+    client; objects too big to cache have the Range forwarded upstream.
+    """
+    if not url.startswith(('http://', 'https://')):
+        return jsonify({'error': 'Only http(s) URLs can be proxied'}), 400
+    
+    entry = proxy_cache.get(url)
+    if entry:
+        response = send_file(
+            entry.path,
+            mimetype=entry.content_type,
+            conditional=True,
+            etag=entry.etag,
+            max_age=PROXY_CACHE_MAX_AGE,
+            as_attachment=download_name is not None,
+            download_name=download_name,
+        )
+        response.headers['X-Proxy-Cache'] = 'HIT'
+        return response
+    
+    range_header = request.headers.get('Range')
+    
+    # Raises GovernorBusy when the proxies are saturated
+    slot = proxy_governor.acquire(urlparse(url).hostname or '')
+    try:
+        upstream = http_get(url, source=source, headers=headers, stream=True)
+        if range_header and upstream.status_code == 200 and cacheable_length(upstream) is None:
+            upstream.close()
+            upstream = http_get(url, source=source, headers=dict(headers, Range=range_header), stream=True)
+    except Exception:
+        slot.release()
+        raise
+    if upstream.status_code >= 400:
+        upstream.close()
+        slot.release()
+        return jsonify({'error': f'Upstream returned {upstream.status_code}'}), upstream.status_code
+    
+    content_type = upstream.headers.get('Content-Type', default_type)
+    content_length = upstream.headers.get('Content-Length')
+    expected_size = int(content_length) if content_length and content_length.isdigit() else None
+    
+    byte_range = None
+    if range_header and upstream.status_code == 200 and expected_size is not None and 'If-Range' not in request.headers:
+        byte_range = parse_range(range_header, expected_size)
+    if byte_range == 'unsatisfiable':
+        upstream.close()
+        slot.release()
+        response = jsonify({'error': 'Requested range not satisfiable'})
+        response.status_code = 416
+        response.headers['Content-Range'] = f'bytes */{expected_size}'
+        return response
+    
+    body = release_when_done(iter_content_and_close(upstream, chunk_size=64 * 1024), slot)
+    
+    response_headers = {
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': f'public, max-age={PROXY_CACHE_MAX_AGE}',
+        'X-Proxy-Cache': 'MISS',
+    }
+    if content_length:
+        response_headers['Content-Length'] = content_length
+    if download_name is not None:
+        response_headers['Content-Disposition'] = f'attachment; filename="{download_name}"'
+    
+    if upstream.status_code == 206:
+        # Partial content of an uncacheable object is passed through
+        response_headers['Content-Range'] = upstream.headers.get('Content-Range', '')
+        response = Response(body, status=206, content_type=content_type, headers=response_headers)
+    elif byte_range:
+        # Cache the whole body, send the client just its range
+        start, end = byte_range
+        response_headers['Content-Range'] = f'bytes {start}-{end}/{expected_size}'
+        response_headers['Content-Length'] = str(end - start + 1)
+        body = slice_chunks(proxy_cache.tee(url, body, content_type, expected_size=expected_size), start, end)
+        response = Response(body, status=206, content_type=content_type, headers=response_headers)
+    else:
+        body = proxy_cache.tee(url, body, content_type, expected_size=expected_size)
+        response = Response(body, status=upstream.status_code, content_type=content_type, headers=response_headers)
+    
+    # The slot is held until the body has finished streaming (or the client goes away)
+    response.call_on_close(slot.release)
+    return response
+
+def cacheable_length(upstream):
+    """The upstream Content-Length if the proxy cache would keep the body, else None"""
+    length = upstream.headers.get('Content-Length', '')
+    if length.isdigit() and int(length) <= proxy_cache.max_object_bytes:
+        return int(length)
+    return None
+
+def release_when_done(chunks, slot):
+    try:
+        yield from chunks
+    finally:
+        slot.release()
+
+def proxy_busy_response(e):
+    response = jsonify({'error': 'Proxy is busy, try again shortly'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
 
 @app.route('/api/download-proxy', methods=['GET'])
 def download_proxy():
@@ -494,24 +1026,10 @@ def download_proxy():
         return jsonify({'error': 'URL required'}), 400
     
     try:
-        # Fetch the file
-        response = requests.get(url, stream=True, timeout=30, headers={
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
-        response.raise_for_status()
-        
-        # Determine content type
-        content_type = response.headers.get('Content-Type', 'application/octet-stream')
-        
-        # Create a response with the file
-        return Response(
-            response.iter_content(chunk_size=8192),
-            content_type=content_type,
-            headers={
-                'Content-Disposition': f'attachment; filename="{filename}"',
-                'Cache-Control': 'no-cache'
-            }
-        )
+        return proxy_media(url, 'download', DOWNLOAD_PROXY_HEADERS, 'application/octet-stream',
+                           download_name=filename)
+    except GovernorBusy as e:
+        return proxy_busy_response(e)
     except Exception as e:
         print(f"Download proxy error: {e}")
         return jsonify({'error': str(e)}), 500
@@ -525,29 +1043,73 @@ def proxy_audio():
         return jsonify({'error': 'No URL provided'}), 400
     
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
-            'Referer': 'https://www.reddit.com/'
-        }
-        
-        response = requests.get(audio_url, headers=headers, stream=True, timeout=10)
-        
-        if response.status_code == 200:
-            return Response(
-                response.iter_content(chunk_size=8192),
-                content_type=response.headers.get('content-type', 'audio/mp4'),
-                headers={
-                    'Accept-Ranges': 'bytes',
-                    'Content-Length': response.headers.get('content-length', '0')
-                }
-            )
-        else:
-            return jsonify({'error': f'Failed to fetch audio: {response.status_code}'}), response.status_code
-            
+        return proxy_media(audio_url, 'audio', AUDIO_PROXY_HEADERS, 'audio/mp4')
+    except GovernorBusy as e:
+        return proxy_busy_response(e)
     except Exception as e:
         print(f"Audio proxy error: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/proxy/metrics', methods=['GET'])
+def get_proxy_metrics():
+    return jsonify({
+        'governor': proxy_governor.stats(),
+        'cache': proxy_cache.stats(),
+    })
+
+# Global deadline (seconds) for concurrent multi-source aggregation
+MEME_FANOUT_DEADLINE = float(os.environ.get('MEME_FANOUT_DEADLINE', '0.8'))
+
+# Upstream response cache for meme-api.com, keyed by URL.
+# (soft_ttl, hard_ttl) in seconds per source: fresh until soft, served stale
+# while refreshing in the background until hard, refetched after that.
+# Override per source with e.g. MEME_API_TTL_REDDIT="60,600".
+MEME_API_TTLS = {
+    'default': (120, 900),
+    'reddit': (120, 900),
+    'instagram': (300, 1800),
+    'twitter': (120, 900),
+    '9gag': (120, 900),
+    'tiktok': (300, 1800),
+    'youtube': (300, 1800),
+    'imgur': (60, 600),
+}
+for _source in MEME_API_TTLS:
+    _override = os.environ.get(f'MEME_API_TTL_{_source.upper()}')
+    if _override:
+        _soft, _hard = (float(x) for x in _override.split(','))
+        MEME_API_TTLS[_source] = (_soft, max(_soft, _hard))
+
+meme_api_cache = SWRCache(max_entries=int(os.environ.get('MEME_API_CACHE_SIZE', '256')))
+
+# Set while a background ingest runs a fetcher: it must see fresh upstream data,
+# not a stale cached copy, or the ingested feed lags one refresh behind
+upstream_fetch_mode = threading.local()
+
+def fetch_meme_api_json(url, source='default', timeout=None, headers=None):
+    """GET a meme-api.com URL through the shared stale-while-revalidate cache"""
+    soft_ttl, hard_ttl = MEME_API_TTLS.get(source, MEME_API_TTLS['default'])
+    
+    def load():
+        response = http_get(url, source='meme-api', headers=headers, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+    
+    if getattr(upstream_fetch_mode, 'force_refresh', False):
+        # Still stored, so request-path readers get the fresh copy too
+        return meme_api_cache.refresh(url, load, soft_ttl=soft_ttl, hard_ttl=hard_ttl)
+    return meme_api_cache.get(url, load, soft_ttl=soft_ttl, hard_ttl=hard_ttl)
+
+def bypassing_upstream_cache(fetch):
+    """Wrap an ingest fetcher so its meme-api.com calls always hit upstream"""
+    def fetch_fresh():
+        upstream_fetch_mode.force_refresh = True
+        try:
+            return fetch()
+        finally:
+            upstream_fetch_mode.force_refresh = False
+    return fetch_fresh
+
 def fetch_reddit_memes():
     # Use Meme API for reliable Indian content
     # We combine multiple subreddits with '+'
@@ -558,10 +1120,9 @@ def fetch_reddit_memes():
     try:
         # Fetch 50 memes from these specific Indian subreddits
         url = f"https://meme-api.com/gimme/{indian_subs}/50"
-        response = requests.get(url, timeout=5)
+        data = fetch_meme_api_json(url, source='reddit')
         
-        if response.status_code == 200:
-            data = response.json()
+        if data:
             posts = data.get('memes', [])
             
             # Filter for Trending: Only keep memes with > 500 upvotes
@@ -597,7 +1158,7 @@ def fetch_reddit_memes():
         try:
             headers = {'User-Agent': 'MemeQuizApp/1.0'}
             url = 'https://www.reddit.com/search.json?q=india+meme&sort=hot&limit=50'
-            response = requests.get(url, headers=headers, timeout=5)
+            response = http_get(url, source='reddit', headers=headers)
             if response.status_code == 200:
                 data = response.json()
                 posts = data.get('data', {}).get('children', [])
@@ -642,40 +1203,48 @@ def process_reddit_posts(posts, memes_list, source='Reddit'):
 def fetch_video_memes():
     """Fetches video memes directly from Reddit JSON"""
     video_subs = ['DesiVideoMemes', 'IndianDankMemes', 'bollywoodmemes', 'IndianHumor']
+    
+    # All subreddits are fetched concurrently under one deadline
+    return fan_out_list(
+        {sub: (lambda sub=sub: fetch_video_subreddit(sub)) for sub in video_subs},
+        deadline=MEME_FANOUT_DEADLINE,
+        group='video-subreddits'
+    )
+
+def fetch_video_subreddit(sub):
     videos = []
     # Use a real browser User-Agent to avoid 429/403 errors
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
     }
     
-    for sub in video_subs:
-        try:
-            url = f'https://www.reddit.com/r/{sub}/hot.json?limit=25'
-            response = requests.get(url, headers=headers, timeout=3)
-            if response.status_code == 200:
-                data = response.json()
-                posts = data.get('data', {}).get('children', [])
+    try:
+        url = f'https://www.reddit.com/r/{sub}/hot.json?limit=25'
+        response = http_get(url, source='reddit', headers=headers)
+        if response.status_code == 200:
+            data = response.json()
+            posts = data.get('data', {}).get('children', [])
+            
+            for post in posts:
+                p = post.get('data', {})
                 
-                for post in posts:
-                    p = post.get('data', {})
+                # Check if it's a video
+                if p.get('is_video') and p.get('secure_media'):
+                    video_data = p.get('secure_media', {}).get('reddit_video', {})
+                    video_url = video_data.get('fallback_url')
                     
-                    # Check if it's a video
-                    if p.get('is_video') and p.get('secure_media'):
-                        video_data = p.get('secure_media', {}).get('reddit_video', {})
-                        video_url = video_data.get('fallback_url')
-                        
-                        if video_url:
-                            videos.append({
-                                'id': f"reddit_vid_{p.get('id')}",
-                                'title': p.get('title'),
-                                'ups': p.get('ups'),
-                                'url': video_url, # This is the MP4 link
-                                'is_video': True,
-                                'source': f"Reddit ({sub})"
-                            })
-        except Exception as e:
-            print(f"Video fetch error {sub}: {e}")
-            
+                    if video_url:
+                        videos.append({
+                            'id': f"reddit_vid_{p.get('id')}",
+                            'title': p.get('title'),
+                            'ups': p.get('ups'),
+                            'url': video_url, # This is the MP4 link
+                            'is_video': True,
+                            'source': f"Reddit ({sub})"
+                        })
+    except Exception as e:
+        print(f"Video fetch error {sub}: {e}")
+        
     return videos
 
 def fetch_instagram_memes():
@@ -696,14 +1265,13 @@ def fetch_instagram_memes():
         }
         
         # Alternative: Use meme aggregator APIs that include Instagram content
-        response = requests.get(
+        data = fetch_meme_api_json(
             'https://meme-api.com/gimme/InstagramReality/20',
-            headers=headers,
-            timeout=5
+            source='instagram',
+            headers=headers
         )
         
-        if response.status_code == 200:
-            data = response.json()
+        if data:
             if 'memes' in data:
                 for meme in data['memes']:
                     memes.append({
@@ -722,7 +1290,7 @@ def fetch_instagram_memes():
         print(f"Instagram fetch error: {e}")
         # Fallback to Imgflip if Instagram fails
         try:
-            response = requests.get('https://api.imgflip.com/get_memes', timeout=5)
+            response = http_get('https://api.imgflip.com/get_memes', source='imgflip')
             if response.status_code == 200:
                 data = response.json()
                 if data.get('success'):
@@ -752,9 +1320,8 @@ def fetch_tiktok_memes():
     memes = []
     try:
         # Use meme APIs that aggregate TikTok-style content
-        response = requests.get('https://meme-api.com/gimme/TikTokCringe/15', timeout=5)
-        if response.status_code == 200:
-            data = response.json()
+        data = fetch_meme_api_json('https://meme-api.com/gimme/TikTokCringe/15', source='tiktok')
+        if data:
             if 'memes' in data:
                 for meme in data['memes']:
                     # Only include actual videos
@@ -782,9 +1349,8 @@ def fetch_youtube_shorts_memes():
     memes = []
     try:
         # Use meme APIs for video content
-        response = requests.get('https://meme-api.com/gimme/videos/20', timeout=5)
-        if response.status_code == 200:
-            data = response.json()
+        data = fetch_meme_api_json('https://meme-api.com/gimme/videos/20', source='youtube')
+        if data:
             if 'memes' in data:
                 for meme in data['memes']:
                     url = meme.get('url', '')
@@ -812,9 +1378,8 @@ def fetch_twitter_memes():
     memes = []
     try:
         # Use meme-api.com which aggregates from multiple sources
-        response = requests.get('https://meme-api.com/gimme/memes/30', timeout=5)
-        if response.status_code == 200:
-            data = response.json()
+        data = fetch_meme_api_json('https://meme-api.com/gimme/memes/30', source='twitter')
+        if data:
             if 'memes' in data:
                 for meme in data['memes']:
                     # Filter for high-quality memes
@@ -841,9 +1406,8 @@ def fetch_9gag_memes():
     memes = []
     try:
         # Use another meme API endpoint
-        response = requests.get('https://meme-api.com/gimme/dankmemes/25', timeout=5)
-        if response.status_code == 200:
-            data = response.json()
+        data = fetch_meme_api_json('https://meme-api.com/gimme/dankmemes/25', source='9gag')
+        if data:
             if 'memes' in data:
                 for meme in data['memes']:
                     memes.append({
@@ -863,51 +1427,165 @@ def fetch_9gag_memes():
     
     return memes
 
+# Background ingestion: each source refreshes on its own schedule into an
+# in-process cache, so /api/memes never waits on an upstream request.
+MEME_INGEST_INTERVALS = {
+    'Reddit': 180,
+    'Instagram': 300,
+    'Twitter': 180,
+    '9GAG': 180,
+    'TikTok': 300,
+    'YouTube': 300,
+}
+MEME_INGEST_COLD_START_WAIT = float(os.environ.get('MEME_INGEST_COLD_START_WAIT', '8'))
+MEME_DEDUP_CAPACITY = int(os.environ.get('MEME_DEDUP_CAPACITY', '20000'))
+
+# The same Reddit post reaches us through several sources under different ids
+meme_deduper = CrossSourceDeduper(capacity=MEME_DEDUP_CAPACITY, near_distance=PHASH_NEAR_DISTANCE)
+meme_ingestor = MemeIngestor(max_workers=len(MEME_INGEST_INTERVALS), merge=meme_deduper.merge)
+
+# pHash per image URL; a None result (failed download/decode) is cached too
+ingest_phash_cache = SWRCache(max_entries=5000, refresh_workers=1)
+phash_download_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=PHASH_DOWNLOAD_WORKERS, thread_name_prefix='phash-download'
+)
+PHASH_CACHE_TTL = 7 * 86400
+
+def hash_remote_image(url):
+    response = http_get(url, source='download', stream=True)
+    try:
+        if response.status_code != 200:
+            return None
+        data = response.raw.read(PHASH_MAX_DOWNLOAD_BYTES + 1, decode_content=True)
+    finally:
+        response.close()
+    if len(data) > PHASH_MAX_DOWNLOAD_BYTES:
+        return None
+    hashes = hash_pool.hash(data, timeout=10)
+    return hashes['phash'] if hashes else None
+
+def with_perceptual_hashes(fetch):
+    """Wrap an ingest source so its image memes carry a 'phash' for near-duplicate collapsing"""
+    def fetch_and_hash():
+        memes = fetch()
+        images = [meme for meme in memes or [] if meme.get('url') and not meme.get('is_video')]
+        futures = {
+            url: phash_download_executor.submit(
+                ingest_phash_cache.get, url, lambda url=url: hash_remote_image(url),
+                soft_ttl=PHASH_CACHE_TTL, hard_ttl=PHASH_CACHE_TTL
+            )
+            for url in {meme['url'] for meme in images}
+        }
+        done, pending = concurrent.futures.wait(futures.values(), timeout=PHASH_INGEST_DEADLINE)
+        # Downloads that never started are dropped so the queue can't build up across
+        # ingest cycles; their images are hashed on a later cycle
+        cancelled = sum(future.cancel() for future in pending)
+        if pending:
+            print(f"⏱️  Hashed {len(done)}/{len(futures)} images within {PHASH_INGEST_DEADLINE}s, {cancelled} deferred")
+        
+        results = {}
+        for url, future in futures.items():
+            if future in done:
+                try:
+                    results[url] = future.result()
+                except Exception as e:
+                    print(f"⚠️  Perceptual hash of {url} failed: {e}")
+        for meme in images:
+            if results.get(meme['url']):
+                meme['phash'] = results[meme['url']]
+        return memes
+    return fetch_and_hash
+
+def add_ingest_source(name, fetch):
+    fetch = bypassing_upstream_cache(fetch)
+    if MEME_PHASH_INGEST and hash_pool.enabled:
+        fetch = with_perceptual_hashes(fetch)
+    meme_ingestor.add_source(name, fetch, MEME_INGEST_INTERVALS[name])
+
+add_ingest_source('Reddit', fetch_reddit_memes)
+add_ingest_source('Instagram', fetch_instagram_memes)
+add_ingest_source('Twitter', fetch_twitter_memes)
+add_ingest_source('9GAG', fetch_9gag_memes)
+add_ingest_source('TikTok', fetch_tiktok_memes)
+add_ingest_source('YouTube', fetch_youtube_shorts_memes)
+
+# Feed ranking: scores are cached per pool version and favorites-based user segment
+feed_ranker = FeedRanker(
+    half_life=float(os.environ.get('FEED_RECENCY_HALF_LIFE', str(6 * 3600))),
+    temperature=float(os.environ.get('FEED_RANK_TEMPERATURE', '0.35'))
+)
+feed_segment_cache = SWRCache(max_entries=4096, refresh_workers=1)
+
+def load_feed_segment(user_email):
+    with app.app_context():
+        rows = db.session.query(Favorite.source, db.func.count(Favorite.id)).filter_by(
+            user_email=user_email
+        ).group_by(Favorite.source).all()
+        return favorite_segment(dict(rows))
+
+def feed_segment():
+    """(segment, affinity) for the current user; anonymous users share one segment"""
+    try:
+        user = get_user_from_token()
+        if not user:
+            return (), {}
+        return feed_segment_cache.get(user.email, lambda: load_feed_segment(user.email), soft_ttl=300, hard_ttl=3600)
+    except SQLAlchemyError as e:
+        # Personalisation is optional; the feed itself never needs the database
+        db.session.rollback()
+        print(f"⚠️  Feed segment unavailable, serving the anonymous feed: {e}")
+        return (), {}
+
 @app.route('/api/memes')
 def get_memes():
-    """Fetch memes from multiple sources for diversity"""
-    all_memes = []
+    """Serve memes from the background-ingested feed cache"""
+    # Started lazily so each gunicorn worker gets its own scheduler after fork
+    meme_ingestor.start()
     
-    # Fetch from multiple sources in parallel for speed
-    import concurrent.futures
+    version, all_memes = meme_ingestor.versioned_snapshot()
+    if not all_memes:
+        version = None
+        # Cold start: fan out to every source and return whatever arrives within
+        # the deadline; stragglers still land in the cache for the next request
+        all_memes = fan_out_list(
+            {name: state.fetch for name, state in meme_ingestor.sources.items()},
+            deadline=MEME_FANOUT_DEADLINE,
+            on_late=meme_ingestor.offer,
+            group='ingest'
+        )
+        all_memes = unique_memes(all_memes)
+        if not all_memes:
+            meme_ingestor.wait_ready(MEME_INGEST_COLD_START_WAIT)
+            version, all_memes = meme_ingestor.versioned_snapshot()
+    
+    # Ranked (with some variety between calls), limited to 120 memes to avoid overwhelming the client
+    segment, affinity = feed_segment()
+    all_memes = feed_ranker.rank(all_memes, 120, version=version, segment=segment, affinity=affinity)
     
-    with concurrent.futures.ThreadPoolExecutor(max_workers=7) as executor:
-        futures = {
-            executor.submit(fetch_reddit_memes): 'Reddit',
-            executor.submit(fetch_instagram_memes): 'Instagram',
-            executor.submit(fetch_twitter_memes): 'Twitter',
-            executor.submit(fetch_9gag_memes): '9GAG',
-            executor.submit(fetch_tiktok_memes): 'TikTok',
-            executor.submit(fetch_youtube_shorts_memes): 'YouTube',
-        }
-        
-        for future in concurrent.futures.as_completed(futures):
-            source = futures[future]
-            try:
-                memes = future.result()
-                all_memes.extend(memes)
-                print(f"✅ {source}: {len(memes)} memes")
-            except Exception as e:
-                print(f"❌ {source} failed: {e}")
-    
-    # Shuffle for variety
-    import random
-    random.shuffle(all_memes)
-    
-    # Limit to 120 memes to avoid overwhelming the client
-    all_memes = all_memes[:120]
-    
-    print(f"🎯 Total memes returned: {len(all_memes)}")
     return jsonify(all_memes)
 
+@app.route('/api/memes/status')
+def get_memes_status():
+    """Per-source freshness of the ingestion cache"""
+    meme_ingestor.start()
+    return jsonify({
+        'total': len(meme_ingestor.snapshot()),
+        'version': meme_ingestor.version,
+        'sources': meme_ingestor.status(),
+        'dedup': meme_deduper.stats(),
+        'ranking': feed_ranker.stats(),
+        'upstream_cache': meme_api_cache.stats(),
+        'response_cache': response_cache.stats(),
+        'compression': compression.stats()
+    })
+
 def fetch_imgur_memes():
     memes = []
     try:
         url = 'https://meme-api.com/gimme/30'
-        response = requests.get(url, timeout=10)
+        data = fetch_meme_api_json(url, source='imgur', timeout=(3.05, 10))
         
-        if response.status_code == 200:
-            data = response.json()
+        if data:
             items = data.get('memes', [])
             
             for item in items:
@@ -936,14 +1614,45 @@ def fetch_imgur_memes():
     
     return memes
 
+def save_image_variants(meme_id, keys):
+    """Image pipeline callback: record the transcoded variants for a meme"""
+    with app.app_context():
+        UserMeme.query.filter_by(id=meme_id).update({
+            UserMeme.full_key: keys['full'],
+            UserMeme.thumb_key: keys['thumb']
+        })
+        db.session.commit()
+    response_cache.bump('user_memes')  # thumb_url
+
+image_pipeline = ImagePipeline(
+    media_store,
+    save_image_variants,
+    max_workers=int(os.environ.get('IMAGE_PIPELINE_WORKERS', '2'))
+)
+
+# pHashes of posted memes, synced incrementally from the database
+user_meme_hashes = BKTree()
+user_meme_hashes_last_id = 0
+user_meme_hashes_lock = threading.Lock()
+
+def find_similar_user_memes(phash):
+    """Return ids of posted memes within PHASH_NEAR_DISTANCE bits of phash"""
+    global user_meme_hashes_last_id
+    with user_meme_hashes_lock:
+        rows = db.session.query(UserMeme.id, UserMeme.phash).filter(
+            UserMeme.id > user_meme_hashes_last_id,
+            UserMeme.phash.isnot(None)
+        ).order_by(UserMeme.id).all()
+        for meme_id, meme_phash in rows:
+            user_meme_hashes.add(meme_phash, meme_id)
+            user_meme_hashes_last_id = meme_id
+        return [meme_id for _, meme_id in user_meme_hashes.search(phash, PHASH_NEAR_DISTANCE)]
+
 @app.route('/api/post-meme', methods=['POST'])
 @login_required
 def post_meme():
     try:
-        # Check if UserMeme table exists
-        from sqlalchemy import inspect
-        inspector = inspect(db.engine)
-        if 'user_memes' not in inspector.get_table_names():
+        if not feature_enabled('community'):
             return jsonify({'error': 'Feature not available yet. Please contact admin.'}), 503
         
         data = request.get_json()
@@ -953,19 +1662,45 @@ def post_meme():
         if not image_data:
             return jsonify({'error': 'No image data provided'}), 400
         
+        # Decode once and keep only the media key in the database
+        try:
+            image_bytes, content_type = decode_data_url(image_data, max_bytes=app.config['MAX_MEME_BYTES'])
+        except MediaError as e:
+            return jsonify({'error': str(e)}), 400
+        image_key = media_store.put(image_bytes, content_type)
+        
+        # Keys are content hashes, so an identical file has already been posted
+        existing = UserMeme.query.filter_by(image_key=image_key).first()
+        if existing:
+            return jsonify({'error': 'This meme has already been posted', 'meme_id': existing.id}), 409
+        
+        # Re-encoded or resized reposts are flagged, not rejected
+        hashes = hash_pool.hash(image_bytes, timeout=PHASH_UPLOAD_TIMEOUT)
+        phash = hashes['phash'] if hashes else None
+        near_duplicates = find_similar_user_memes(phash) if phash else []
+        
         # Create new meme
         new_meme = UserMeme(
             user_email=current_user.email,
             title=title,
-            image_data=image_data
+            image_key=image_key,
+            phash=phash
         )
         
         db.session.add(new_meme)
         db.session.commit()
+        response_cache.bump('user_memes')
+        
+        if near_duplicates:
+            print(f"⚠️  Meme {new_meme.id} looks like a repost of {near_duplicates}")
+        
+        # Compressed full-size image and thumbnail are produced off the request thread
+        image_pipeline.submit(new_meme.id, image_key)
         
         return jsonify({
             'success': True,
             'meme_id': new_meme.id,
+            'near_duplicates': near_duplicates,
             'message': 'Meme posted successfully!'
         })
     except Exception as e:
@@ -974,74 +1709,130 @@ def post_meme():
         return jsonify({'error': 'Failed to post meme. Feature may not be available yet.'}), 500
 
 @app.route('/api/user-memes', methods=['GET'])
+@response_cache.cached(('user_memes',), max_age=API_CACHE_MAX_AGE, s_maxage=API_CACHE_S_MAXAGE, vary=session_user_key)
 def get_user_memes():
     try:
-        # Check if UserMeme table exists
-        from sqlalchemy import inspect
-        inspector = inspect(db.engine)
-        if 'user_memes' not in inspector.get_table_names():
-            return jsonify([])  # Return empty array if table doesn't exist
+        if not feature_enabled('community'):
+            return jsonify([])  # Return empty array if the feature isn't available
         
         user = get_user_from_token()
         
-        # Get recent user-generated memes
-        memes = UserMeme.query.order_by(UserMeme.created_at.desc()).limit(50).all()
+        # Get a page of recent user-generated memes with their authors in one query
+        memes, next_cursor = paginate(
+            user_memes_query(),
+            UserMeme.created_at, UserMeme.id,
+            default_limit=50, max_limit=100
+        )
+        meme_ids = [meme.id for meme in memes]
+        
+        # One aggregated query for comment counts, one IN query for the caller's upvotes
+        comment_counts = {}
+        upvoted_ids = set()
+        if meme_ids:
+            comment_counts = dict(comment_counts_query(meme_ids).all())
+            if user:
+                upvoted_ids = {row[0] for row in upvoted_ids_query(user.email, meme_ids).all()}
         
         result = []
         for meme in memes:
-            has_upvoted = False
-            if user:
-                has_upvoted = Upvote.query.filter_by(user_email=user.email, meme_id=meme.id).first() is not None
-
             result.append({
                 'id': meme.id, # Integer ID for internal use
                 'display_id': f'user_{meme.id}', # String ID for frontend
                 'title': meme.title,
-                'url': meme.image_data,  # Base64 data URL
+                'url': meme.image_url,
+                'thumb_url': meme.thumbnail_url,
                 'author': meme.user.name if meme.user else 'Anonymous',
                 'author_pic': meme.user.picture if meme.user else None,
                 'ups': meme.upvotes,
-                'has_upvoted': has_upvoted,
-                'comment_count': Comment.query.filter_by(meme_id=meme.id).count(),
+                'has_upvoted': meme.id in upvoted_ids,
+                'comment_count': comment_counts.get(meme.id, 0),
                 'source': 'user_generated',
                 'isVideo': False,
-                'created_at': meme.created_at.isoformat()
+                'created_at': meme.created_at
             })
         
-        return jsonify(result)
+        return paginated_response(result, next_cursor)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error fetching user memes: {str(e)}")
         return jsonify([])  # Return empty array on error
 
+@app.route('/media/<key>')
+def serve_media(key):
+    """Serve stored meme images; keys are content hashes so they never change"""
+    try:
+        path = media_store.local_path(key)
+    except MediaError:
+        return jsonify({'error': 'Not found'}), 404
+    
+    if not path or not os.path.exists(path):
+        return jsonify({'error': 'Not found'}), 404
+    
+    response = send_file(path, mimetype=content_type_for_key(key), conditional=True, etag=key)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
 @app.route('/api/memes/<int:meme_id>/upvote', methods=['POST'])
 def upvote_meme(meme_id):
+    if not feature_enabled('upvotes'):
+        return jsonify({'error': 'Feature not available yet. Please contact admin.'}), 503
+    
     user = get_user_from_token()
     if not user:
         return jsonify({'error': 'Unauthorized'}), 401
         
-    meme = UserMeme.query.get(meme_id)
-    if not meme:
+    meme_author = db.session.query(UserMeme.user_email).filter_by(id=meme_id).scalar()
+    if meme_author is None:
         return jsonify({'error': 'Meme not found'}), 404
-        
-    existing_vote = Upvote.query.filter_by(user_email=user.email, meme_id=meme_id).first()
     
-    if existing_vote:
-        # Toggle off
-        db.session.delete(existing_vote)
-        meme.upvotes = max(0, meme.upvotes - 1)
+    # The counter is only ever changed with atomic SQL increments, and the
+    # _user_meme_uc unique constraint decides which concurrent request wins,
+    # so simultaneous votes can't lose updates or double count.
+    counter = UserMeme.query.filter(UserMeme.id == meme_id)
+    
+    # Toggle off: the DELETE's rowcount says whether this request removed the vote.
+    # The vote is read first so its -1 lands in the period its +1 was counted in.
+    vote = upvote_query(user.email, meme_id).with_entities(Upvote.id, Upvote.created_at).first()
+    removed = vote is not None and Upvote.query.filter_by(id=vote.id).delete(synchronize_session=False)
+    
+    if removed:
+        counter.filter(UserMeme.upvotes > 0).update(
+            {UserMeme.upvotes: UserMeme.upvotes - 1}, synchronize_session=False
+        )
+        write_buffer.add('leaderboard_upvotes', {
+            'user_email': meme_author, 'delta': -1, 'when': vote.created_at or datetime.utcnow()
+        })
         action = 'removed'
     else:
         # Toggle on
-        vote = Upvote(user_email=user.email, meme_id=meme_id)
-        db.session.add(vote)
-        meme.upvotes += 1
         action = 'added'
-        
+        voted_at = datetime.utcnow()
+        try:
+            with db.session.begin_nested():
+                db.session.add(Upvote(user_email=user.email, meme_id=meme_id, created_at=voted_at))
+        except IntegrityError:
+            # A concurrent request already recorded this vote and counted it
+            pass
+        else:
+            counter.update(
+                {UserMeme.upvotes: db.func.coalesce(UserMeme.upvotes, 0) + 1}, synchronize_session=False
+            )
+            write_buffer.add('leaderboard_upvotes', {'user_email': meme_author, 'delta': 1, 'when': voted_at})
+    
     db.session.commit()
-    return jsonify({'success': True, 'upvotes': meme.upvotes, 'action': action})
+    response_cache.bump('user_memes')
+    
+    upvotes = db.session.query(UserMeme.upvotes).filter_by(id=meme_id).scalar() or 0
+    return jsonify({'success': True, 'upvotes': upvotes, 'action': action})
 
 @app.route('/api/memes/<int:meme_id>/comments', methods=['GET', 'POST'])
+# no-cache: a poster reloads the list right away and must see their comment
+@response_cache.cached(('comments:{meme_id}',), no_cache=True)
 def handle_comments(meme_id):
+    if not feature_enabled('comments'):
+        return jsonify({'error': 'Feature not available yet. Please contact admin.'}), 503
+    
     if request.method == 'POST':
         user = get_user_from_token()
         if not user:
@@ -1055,6 +1846,7 @@ def handle_comments(meme_id):
         comment = Comment(user_email=user.email, meme_id=meme_id, content=content)
         db.session.add(comment)
         db.session.commit()
+        response_cache.bump(f'comments:{meme_id}', 'user_memes')  # comment_count
         
         return jsonify({
             'success': True,
@@ -1063,18 +1855,147 @@ def handle_comments(meme_id):
                 'user': user.name,
                 'picture': user.picture,
                 'content': comment.content,
-                'created_at': comment.created_at.isoformat()
+                'created_at': comment.created_at
             }
         })
     else:
-        comments = Comment.query.filter_by(meme_id=meme_id).order_by(Comment.created_at.desc()).all()
-        return jsonify([{
+        try:
+            comments, next_cursor = paginate(
+                comments_query(meme_id),
+                Comment.created_at, Comment.id,
+                default_limit=50, max_limit=200
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return paginated_response([{
             'id': c.id,
             'user': c.user.name,
             'picture': c.user.picture,
             'content': c.content,
-            'created_at': c.created_at.isoformat()
-        } for c in comments])
+            'created_at': c.created_at
+        } for c in comments], next_cursor)
+
+# Leaderboard
+LEADERBOARD_WINDOWS = ('all', 'daily', 'weekly')
+# Daily/weekly rows older than this are pruned; nothing reads them
+LEADERBOARD_KEEP_DAYS = int(os.environ.get('LEADERBOARD_KEEP_DAYS', '60'))
+LEADERBOARD_PRUNE_INTERVAL = 24 * 60 * 60
+leaderboard_pruned_at = 0.0
+
+def leaderboard_period(window, when=None):
+    """Summary-table key for a leaderboard window at a point in time"""
+    when = when or datetime.utcnow()
+    if window == 'daily':
+        return f"day:{when:%Y-%m-%d}"
+    if window == 'weekly':
+        year, week, _ = when.isocalendar()
+        return f"week:{year}-W{week:02d}"
+    return 'all'
+
+def bump_leaderboard(user_email, score=None, upvotes_delta=0, when=None):
+    """Fold one event into every period's summary row (caller commits)"""
+    values = {}
+    if score is not None:
+        values[LeaderboardStat.best_score] = db.case(
+            (LeaderboardStat.best_score < score, score), else_=LeaderboardStat.best_score
+        )
+    if upvotes_delta:
+        values[LeaderboardStat.total_upvotes] = LeaderboardStat.total_upvotes + upvotes_delta
+    if not values:
+        return
+    values[LeaderboardStat.updated_at] = datetime.utcnow()
+    
+    for window in LEADERBOARD_WINDOWS:
+        period = leaderboard_period(window, when)
+        stat = LeaderboardStat.query.filter_by(user_email=user_email, period=period)
+        if stat.update(values, synchronize_session=False):
+            continue
+        try:
+            # First event for this user/period; a concurrent insert falls back to the update
+            with db.session.begin_nested():
+                db.session.add(LeaderboardStat(
+                    user_email=user_email,
+                    period=period,
+                    best_score=max(score or 0, 0),
+                    total_upvotes=upvotes_delta
+                ))
+        except IntegrityError:
+            stat.update(values, synchronize_session=False)
+
+def prune_leaderboard(keep_days=LEADERBOARD_KEEP_DAYS):
+    """Delete daily/weekly summary rows older than keep_days (caller commits)"""
+    cutoff = datetime.utcnow() - timedelta(days=keep_days)
+    deleted = 0
+    # Period keys are zero-padded, so string order is date order within a window
+    for window, prefix in (('daily', 'day:%'), ('weekly', 'week:%')):
+        deleted += LeaderboardStat.query.filter(
+            LeaderboardStat.period.like(prefix),
+            LeaderboardStat.period < leaderboard_period(window, cutoff)
+        ).delete(synchronize_session=False)
+    return deleted
+
+def prune_leaderboard_if_due():
+    """Prune at most once per LEADERBOARD_PRUNE_INTERVAL per worker"""
+    global leaderboard_pruned_at
+    now = time.time()
+    if now - leaderboard_pruned_at < LEADERBOARD_PRUNE_INTERVAL:
+        return
+    leaderboard_pruned_at = now
+    with app.app_context():
+        try:
+            deleted = prune_leaderboard()
+            db.session.commit()
+            if deleted:
+                print(f"✅ Pruned {deleted} old leaderboard rows")
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️  Leaderboard prune failed: {e}")
+
+# Write-behind buffer
+# Append-only and high-frequency writes (login history, quiz scores, leaderboard
+# vote tallies) are batched into one bulk insert + commit per flush.
+def flush_buffered_writes(batch):
+    """Write one batch of buffered records in a single transaction"""
+    logins = [record for kind, record in batch if kind == 'login_history']
+    scores = [record for kind, record in batch if kind == 'quiz_score']
+    
+    # Leaderboard updates are coalesced per user, period and kind before touching the table.
+    # Without the leaderboard tables they are skipped, so the raw rows still land.
+    best_scores = {}
+    upvote_deltas = defaultdict(int)
+    if feature_enabled('leaderboard'):
+        for record in scores:
+            key = (record['user_email'], record['created_at'].date())
+            best_scores[key] = max(best_scores.get(key, record['score']), record['score'])
+        for kind, record in batch:
+            if kind == 'leaderboard_upvotes':
+                upvote_deltas[(record['user_email'], record['when'].date())] += record['delta']
+    
+    with app.app_context():
+        try:
+            if logins:
+                db.session.execute(db.insert(LoginHistory), logins)
+            if scores:
+                db.session.execute(db.insert(QuizScore), scores)
+            for (user_email, day), score in best_scores.items():
+                bump_leaderboard(user_email, score=score, when=datetime.combine(day, datetime.min.time()))
+            for (user_email, day), delta in upvote_deltas.items():
+                if delta:
+                    bump_leaderboard(user_email, upvotes_delta=delta, when=datetime.combine(day, datetime.min.time()))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    if best_scores or upvote_deltas:
+        response_cache.bump('leaderboard')
+        prune_leaderboard_if_due()
+
+write_buffer = WriteBehindBuffer(
+    flush_buffered_writes,
+    max_rows=int(os.environ.get('WRITE_BEHIND_MAX_ROWS', '200')),
+    interval_ms=int(os.environ.get('WRITE_BEHIND_INTERVAL_MS', '500'))
+)
 
 @app.route('/api/quiz/score', methods=['POST'])
 def save_quiz_score():
@@ -1082,36 +2003,76 @@ def save_quiz_score():
     if not user:
         return jsonify({'error': 'Unauthorized'}), 401
         
-    data = request.json
+    data = request.get_json(silent=True) or {}
     score = data.get('score', 0)
+    # Validated here: a bad value would otherwise only fail later, in the batch insert
+    if not isinstance(score, int) or isinstance(score, bool):
+        return jsonify({'error': 'score must be an integer'}), 400
     
-    new_score = QuizScore(user_email=user.email, score=score)
-    db.session.add(new_score)
-    db.session.commit()
+    # Buffered: the score row and leaderboard update land in the next batch commit
+    write_buffer.add('quiz_score', {'user_email': user.email, 'score': score, 'created_at': datetime.utcnow()})
     
     return jsonify({'success': True})
 
 @app.route('/api/leaderboard', methods=['GET'])
+@response_cache.cached(('leaderboard',), max_age=API_CACHE_MAX_AGE, s_maxage=API_CACHE_S_MAXAGE)
 def get_leaderboard():
+    if not feature_enabled('leaderboard'):
+        return jsonify({'quiz_leaders': [], 'meme_leaders': []})
+    
+    window = request.args.get('window', 'all')
+    if window not in LEADERBOARD_WINDOWS:
+        return jsonify({'error': f"window must be one of {', '.join(LEADERBOARD_WINDOWS)}"}), 400
+    
     try:
+        period = leaderboard_period(window)
+        
         # Top Quiz Scores
-        top_scores = db.session.query(
-            User.name, User.picture, db.func.max(QuizScore.score).label('max_score')
-        ).join(QuizScore).group_by(User.email).order_by(db.desc('max_score')).limit(10).all()
+        top_scores = leaderboard_top_query(period, LeaderboardStat.best_score).all()
         
         # Top Meme Creators (by total upvotes)
-        top_creators = db.session.query(
-            User.name, User.picture, db.func.sum(UserMeme.upvotes).label('total_upvotes')
-        ).join(UserMeme).group_by(User.email).order_by(db.desc('total_upvotes')).limit(10).all()
+        top_creators = leaderboard_top_query(period, LeaderboardStat.total_upvotes).all()
         
         return jsonify({
-            'quiz_leaders': [{'name': r[0], 'picture': r[1], 'score': r[2]} for r in top_scores],
-            'meme_leaders': [{'name': r[0], 'picture': r[1], 'upvotes': int(r[2] or 0)} for r in top_creators]
+            'window': window,
+            'quiz_leaders': [{'name': r.user.name, 'picture': r.user.picture, 'score': r.best_score} for r in top_scores],
+            'meme_leaders': [{'name': r.user.name, 'picture': r.user.picture, 'upvotes': r.total_upvotes} for r in top_creators]
         })
     except Exception as e:
         print(f"Leaderboard error: {e}")
         return jsonify({'quiz_leaders': [], 'meme_leaders': []})
 
+# Admin Routes
+@app.route('/api/admin/features', methods=['GET', 'POST'])
+def admin_features():
+    """Inspect or toggle feature flags for every worker; POST {"disable": [...], "enable": [...]}"""
+    if not require_admin():
+        return jsonify({'error': 'Not found'}), 404
+    
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        overrides = read_feature_overrides()
+        disabled = set(overrides.get('disabled', ())).union(data.get('disable', [])).difference(data.get('enable', []))
+        enabled = set(overrides.get('enabled', ())).union(data.get('enable', [])).difference(data.get('disable', []))
+        write_feature_overrides({'disabled': sorted(disabled), 'enabled': sorted(enabled)})
+    
+    return jsonify({
+        'features': feature_status(),
+        'disabled': sorted(DISABLED_FEATURES),
+        'tables': sorted(SCHEMA_TABLES),
+        'columns': {table: sorted(columns) for table, columns in SCHEMA_COLUMNS.items()}
+    })
+
+@app.route('/api/admin/schema/refresh', methods=['POST'])
+def admin_refresh_schema():
+    """Re-read the schema after a migration, in every worker, without restarting the app"""
+    if not require_admin():
+        return jsonify({'error': 'Not found'}), 404
+    
+    # Other workers see the new timestamp on their next request and re-read too
+    write_feature_overrides({'schema_refreshed_at': time.time()})
+    return jsonify({'features': feature_status(), 'tables': sorted(SCHEMA_TABLES)})
+
 if __name__ == '__main__':
     print("Starting MemeMaster Server...")
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,374 @@
+"""
+Optional async serving mode.
+
+The streaming proxy routes (/api/proxy-audio and /api/download-proxy) are
+handled natively on the event loop with httpx, so one process can keep
+thousands of slow transfers open without tying up a thread per client.
+Proxy cache hits are streamed from local disk on the loop as well, with
+Range (206) and ETag/304 support. Every other request is passed to the
+unchanged Flask app through asgiref's WSGI adapter, running on a sized
+thread pool so slow Flask requests don't serialize behind each other.
+
+Needs the optional packages:
+    pip install httpx asgiref uvicorn
+
+Run with:
+    uvicorn asgi:app --host 0.0.0.0 --port 8000
+"""
+
+import asyncio
+import concurrent.futures
+import json
+import os
+from urllib.parse import parse_qs, urlparse
+
+try:
+    import httpx
+    from asgiref.sync import sync_to_async
+    from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+except ImportError as e:
+    raise ImportError(f"Async serving mode needs httpx and asgiref (pip install httpx asgiref uvicorn): {e}")
+
+from app import (
+    app as flask_app, proxy_cache, PROXY_CACHE_MAX_AGE, PROXY_MAX_WAIT,
+    DOWNLOAD_PROXY_HEADERS, AUDIO_PROXY_HEADERS
+)
+from http_client import HTTP_TIMEOUTS
+from proxy_cache import parse_range
+from proxy_governor import GovernorBusy
+
+# In-flight limits for the event-loop proxies (per process)
+ASYNC_PROXY_MAX_INFLIGHT = int(os.environ.get('ASYNC_PROXY_MAX_INFLIGHT', '1000'))
+ASYNC_PROXY_MAX_PER_HOST = int(os.environ.get('ASYNC_PROXY_MAX_PER_HOST', '100'))
+ASYNC_PROXY_CHUNK_SIZE = 64 * 1024
+
+# Threads for the Flask app (like gunicorn's --threads)
+ASGI_WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS', '16'))
+
+wsgi_executor = concurrent.futures.ThreadPoolExecutor(max_workers=ASGI_WSGI_THREADS, thread_name_prefix='asgi-wsgi')
+
+
+class ThreadedWsgiInstance(WsgiToAsgiInstance):
+    """asgiref's adapter runs every request on one shared thread
+    (thread_sensitive=True); this one spreads them over wsgi_executor"""
+
+    async def run_wsgi_app(self, body):
+        run = WsgiToAsgiInstance.__dict__['run_wsgi_app'].func  # The undecorated sync function
+        await sync_to_async(run, thread_sensitive=False, executor=wsgi_executor)(self, body)
+
+
+class ThreadedWsgiToAsgi(WsgiToAsgi):
+    async def __call__(self, scope, receive, send):
+        await ThreadedWsgiInstance(self.wsgi_application, self.duplicate_header_limit)(scope, receive, send)
+
+
+wsgi_app = ThreadedWsgiToAsgi(flask_app)
+
+
+class AsyncGovernor:
+    """Event-loop counterpart of proxy_governor.ConcurrencyGovernor"""
+
+    def __init__(self, max_inflight, max_per_host, max_wait):
+        self.max_inflight = max_inflight
+        self.max_per_host = max_per_host
+        self.max_wait = max_wait
+        self._cond = None
+        self._inflight = 0
+        self._per_host = {}
+        self._waiting = 0
+        self.peak_waiting = 0
+        self.admitted = 0
+        self.timed_out = 0
+
+    def _has_room(self, host):
+        return self._inflight < self.max_inflight and self._per_host.get(host, 0) < self.max_per_host
+
+    async def acquire(self, host):
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        async with self._cond:
+            if not self._has_room(host):
+                self._waiting += 1
+                self.peak_waiting = max(self.peak_waiting, self._waiting)
+                try:
+                    await asyncio.wait_for(self._cond.wait_for(lambda: self._has_room(host)), self.max_wait)
+                except asyncio.TimeoutError:
+                    self.timed_out += 1
+                    raise GovernorBusy('timed out waiting for a proxy slot', retry_after=max(1, int(self.max_wait)))
+                finally:
+                    self._waiting -= 1
+            self._inflight += 1
+            self._per_host[host] = self._per_host.get(host, 0) + 1
+            self.admitted += 1
+
+    async def release(self, host):
+        async with self._cond:
+            self._inflight -= 1
+            self._per_host[host] -= 1
+            if self._per_host[host] <= 0:
+                del self._per_host[host]
+            self._cond.notify_all()
+
+    def stats(self):
+        return {
+            'inflight': self._inflight,
+            'max_inflight': self.max_inflight,
+            'per_host': dict(self._per_host),
+            'max_per_host': self.max_per_host,
+            'queue_depth': self._waiting,
+            'peak_queue_depth': self.peak_waiting,
+            'admitted': self.admitted,
+            'timed_out': self.timed_out,
+        }
+
+
+governor = AsyncGovernor(ASYNC_PROXY_MAX_INFLIGHT, ASYNC_PROXY_MAX_PER_HOST, PROXY_MAX_WAIT)
+_client = None
+
+
+def get_client():
+    """Shared httpx client (connection pool), created on the running loop"""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=ASYNC_PROXY_MAX_INFLIGHT, max_keepalive_connections=100),
+        )
+    return _client
+
+
+def upstream_timeout(source):
+    connect, read = HTTP_TIMEOUTS.get(source, HTTP_TIMEOUTS['default'])
+    return httpx.Timeout(read, connect=connect)
+
+
+async def send_json(send, status, payload, headers=()):
+    body = json.dumps(payload).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+                   + list(headers),
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def serve_cached(scope, send, entry, download_name=None):
+    """Stream a proxy cache entry from disk; False if it was evicted meanwhile"""
+    request_headers = {name.decode('latin-1'): value.decode('latin-1') for name, value in scope['headers']}
+    etag = f'"{entry.etag}"'
+    response_headers = [
+        (b'content-type', entry.content_type.encode('latin-1')),
+        (b'accept-ranges', b'bytes'),
+        (b'etag', etag.encode('latin-1')),
+        (b'cache-control', f'public, max-age={PROXY_CACHE_MAX_AGE}'.encode()),
+        (b'x-proxy-cache', b'HIT'),
+    ]
+    if download_name is not None:
+        response_headers.append(
+            (b'content-disposition', f'attachment; filename="{download_name}"'.encode('latin-1', 'replace')))
+
+    if_none_match = request_headers.get('if-none-match', '')
+    if if_none_match.strip() == '*' or etag in [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]:
+        await send({'type': 'http.response.start', 'status': 304, 'headers': response_headers})
+        await send({'type': 'http.response.body', 'body': b''})
+        return True
+
+    byte_range = None
+    if request_headers.get('if-range', etag) == etag:  # A stale If-Range gets the whole file
+        byte_range = parse_range(request_headers.get('range'), entry.size)
+    if byte_range == 'unsatisfiable':
+        await send_json(send, 416, {'error': 'Requested range not satisfiable'},
+                        [(b'content-range', f'bytes */{entry.size}'.encode())])
+        return True
+
+    try:
+        f = await asyncio.to_thread(open, entry.path, 'rb')
+    except FileNotFoundError:
+        return False
+
+    with f:
+        if byte_range:
+            start, end = byte_range
+            status = 206
+            response_headers.append((b'content-range', f'bytes {start}-{end}/{entry.size}'.encode()))
+        else:
+            start, end, status = 0, entry.size - 1, 200
+        remaining = end - start + 1
+        response_headers.append((b'content-length', str(remaining).encode()))
+        await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+
+        f.seek(start)
+        while remaining > 0:
+            chunk = await asyncio.to_thread(f.read, min(ASYNC_PROXY_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+    return True
+
+
+def cacheable_length(upstream):
+    """The upstream Content-Length if the proxy cache would keep the body, else None"""
+    length = upstream.headers.get('Content-Length', '')
+    if length.isdigit() and int(length) <= proxy_cache.max_object_bytes:
+        return int(length)
+    return None
+
+
+async def proxy_stream(scope, send, url, source, headers, default_type, download_name=None):
+    """Stream url to the client, teeing complete 200 bodies into proxy_cache.
+
+    A Range miss fetches the whole object (so it gets cached) and sends the
+    client only its range; objects too big to cache have the Range forwarded.
+    """
+    client_headers = {name.decode('latin-1'): value.decode('latin-1') for name, value in scope['headers']}
+    range_header = client_headers.get('range')
+
+    host = urlparse(url).hostname or ''
+    try:
+        await governor.acquire(host)
+    except GovernorBusy as e:
+        await send_json(send, 503, {'error': 'Proxy is busy, try again shortly'},
+                        [(b'retry-after', str(e.retry_after).encode())])
+        return
+
+    writer = None
+    started = False
+    try:
+        client = get_client()
+        request = client.build_request('GET', url, headers=headers, timeout=upstream_timeout(source))
+        upstream = await client.send(request, stream=True)
+        if range_header and upstream.status_code == 200 and cacheable_length(upstream) is None:
+            await upstream.aclose()
+            request = client.build_request('GET', url, headers=dict(headers, Range=range_header),
+                                           timeout=upstream_timeout(source))
+            upstream = await client.send(request, stream=True)
+        try:
+            if upstream.status_code >= 400:
+                await send_json(send, upstream.status_code, {'error': f'Upstream returned {upstream.status_code}'})
+                return
+
+            content_type = upstream.headers.get('Content-Type', default_type)
+            content_length = upstream.headers.get('Content-Length')
+            expected_size = int(content_length) if content_length and content_length.isdigit() else None
+            byte_range = None
+            if range_header and upstream.status_code == 200 and expected_size is not None \
+                    and 'if-range' not in client_headers:
+                byte_range = parse_range(range_header, expected_size)
+            if byte_range == 'unsatisfiable':
+                await send_json(send, 416, {'error': 'Requested range not satisfiable'},
+                                [(b'content-range', f'bytes */{expected_size}'.encode())])
+                return
+
+            response_headers = [
+                (b'content-type', content_type.encode('latin-1')),
+                (b'accept-ranges', b'bytes'),
+                (b'cache-control', f'public, max-age={PROXY_CACHE_MAX_AGE}'.encode()),
+                (b'x-proxy-cache', b'MISS'),
+            ]
+            if download_name is not None:
+                response_headers.append(
+                    (b'content-disposition', f'attachment; filename="{download_name}"'.encode('latin-1', 'replace')))
+
+            status = upstream.status_code
+            start, end = 0, None  # Bytes of the upstream body to send (end inclusive; None: all)
+            if status == 206:
+                # Partial content of an uncacheable object is passed through
+                response_headers.append((b'content-range', upstream.headers.get('Content-Range', '').encode('latin-1')))
+            else:
+                writer = await asyncio.to_thread(proxy_cache.writer, url, content_type, expected_size=expected_size)
+            if byte_range:
+                start, end = byte_range
+                status = 206
+                response_headers.append((b'content-range', f'bytes {start}-{end}/{expected_size}'.encode()))
+                response_headers.append((b'content-length', str(end - start + 1).encode()))
+            elif content_length:
+                response_headers.append((b'content-length', content_length.encode('latin-1')))
+
+            await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+            started = True
+            position = 0
+            finished = False
+            async for chunk in upstream.aiter_raw(ASYNC_PROXY_CHUNK_SIZE):
+                if writer:
+                    await asyncio.to_thread(writer.write, chunk)
+                chunk_end = position + len(chunk)
+                if not finished and chunk_end > start:
+                    part = chunk[max(0, start - position):None if end is None else end + 1 - position]
+                    await send({'type': 'http.response.body', 'body': part, 'more_body': True})
+                    if end is not None and chunk_end > end:
+                        # Client has its range; keep reading so the cache gets the whole object
+                        await send({'type': 'http.response.body', 'body': b''})
+                        finished = True
+                position = chunk_end
+            if not finished:
+                await send({'type': 'http.response.body', 'body': b''})
+            if writer:
+                # Promotion may evict or rescan the cache directory; keep it off the loop
+                await asyncio.to_thread(writer.commit)
+        finally:
+            await upstream.aclose()
+    except httpx.HTTPError as e:
+        print(f"Async proxy error: {e}")
+        if not started:
+            await send_json(send, 502, {'error': str(e)})
+    finally:
+        if writer:
+            await asyncio.to_thread(writer.abort)
+        await governor.release(host)
+
+
+async def handle_proxy(scope, receive, send):
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    url = query.get('url', [None])[0]
+
+    if not url:
+        error = 'URL required' if scope['path'] == '/api/download-proxy' else 'No URL provided'
+        await send_json(send, 400, {'error': error})
+        return
+    if not url.startswith(('http://', 'https://')):
+        await send_json(send, 400, {'error': 'Only http(s) URLs can be proxied'})
+        return
+
+    download_name = query.get('filename', ['download'])[0] if scope['path'] == '/api/download-proxy' else None
+    entry = await asyncio.to_thread(proxy_cache.get, url)
+    if entry and await serve_cached(scope, send, entry, download_name):
+        return
+
+    if download_name is not None:
+        await proxy_stream(scope, send, url, 'download', DOWNLOAD_PROXY_HEADERS, 'application/octet-stream',
+                           download_name=download_name)
+    else:
+        await proxy_stream(scope, send, url, 'audio', AUDIO_PROXY_HEADERS, 'audio/mp4')
+
+
+async def handle_metrics(scope, receive, send):
+    await send_json(send, 200, {'governor': governor.stats(), 'cache': proxy_cache.stats()})
+
+
+ASYNC_ROUTES = {
+    '/api/proxy-audio': handle_proxy,
+    '/api/download-proxy': handle_proxy,
+    '/api/proxy/metrics': handle_metrics,
+}
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if _client is not None:
+                    await _client.aclose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    handler = ASYNC_ROUTES.get(scope.get('path'))
+    if scope['type'] == 'http' and scope['method'] == 'GET' and handler:
+        await handler(scope, receive, send)
+    else:
+        await wsgi_app(scope, receive, send)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Index Audit for MemeMaster
+Runs EXPLAIN on the queries behind each hot route and flags full table scans
+and sorts that can't use an index. Works on SQLite, MySQL and PostgreSQL.
+
+Usage:
+    python audit_indexes.py
+
+Exits with status 1 if any query does a full table scan.
+"""
+
+import os
+import sys
+from datetime import datetime
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import (
+    app, db, Favorite, UserMeme, Comment, LeaderboardStat, leaderboard_period, page_query,
+    favorites_query, favorite_lookup_query, user_memes_query, comment_counts_query,
+    upvoted_ids_query, comments_query, upvote_query, leaderboard_top_query
+)
+from rebuild_leaderboard import score_rows_query, upvote_rows_query
+
+SAMPLE_EMAIL = 'audit@example.com'
+SAMPLE_MEME_IDS = [1, 2, 3]
+SAMPLE_CURSOR = (datetime(2024, 1, 1), 100)
+
+
+def route_queries():
+    """(route, description, query, full scan expected) for every hot-path query.
+
+    The queries come from the same builders the routes and scripts call,
+    with the page sizes the routes use by default.
+    """
+    return [
+        ('GET /api/favorites', 'favorites page',
+         page_query(favorites_query(SAMPLE_EMAIL), Favorite.saved_at, Favorite.id, 100), False),
+        ('GET /api/favorites', 'cursor page',
+         page_query(favorites_query(SAMPLE_EMAIL), Favorite.saved_at, Favorite.id, 100, SAMPLE_CURSOR), False),
+        ('POST /api/favorites', 'existing favorite lookup',
+         favorite_lookup_query(SAMPLE_EMAIL, 'reddit_abc').limit(1), False),
+        ('DELETE /api/favorites/by-meme', 'favorite lookup',
+         favorite_lookup_query(SAMPLE_EMAIL, 'reddit_abc').limit(1), False),
+        ('GET /api/user-memes', 'first page',
+         page_query(user_memes_query(), UserMeme.created_at, UserMeme.id, 50), False),
+        ('GET /api/user-memes', 'cursor page',
+         page_query(user_memes_query(), UserMeme.created_at, UserMeme.id, 50, SAMPLE_CURSOR), False),
+        ('GET /api/user-memes', 'comment counts', comment_counts_query(SAMPLE_MEME_IDS), False),
+        ('GET /api/user-memes', "caller's upvotes", upvoted_ids_query(SAMPLE_EMAIL, SAMPLE_MEME_IDS), False),
+        ('GET /api/memes/<id>/comments', 'comments page',
+         page_query(comments_query(1), Comment.created_at, Comment.id, 50), False),
+        ('POST /api/memes/<id>/upvote', 'vote lookup', upvote_query(SAMPLE_EMAIL, 1), False),
+        ('GET /api/leaderboard', 'top quiz scores',
+         leaderboard_top_query(leaderboard_period('all'), LeaderboardStat.best_score), False),
+        ('GET /api/leaderboard', 'top creators',
+         leaderboard_top_query(leaderboard_period('all'), LeaderboardStat.total_upvotes), False),
+        # Offline batch job: reads every row on purpose
+        ('rebuild_leaderboard.py', 'quiz score scan', score_rows_query(), True),
+        ('rebuild_leaderboard.py', 'upvote scan', upvote_rows_query(), True),
+    ]
+
+
+def explain(conn, statement):
+    """Return (plan lines, full_scans, sorts) for one query or select statement"""
+    dialect = conn.dialect.name
+    statement = getattr(statement, 'statement', statement)  # ORM Query -> its select()
+    compiled = statement.compile(dialect=conn.dialect, compile_kwargs={'render_postcompile': True})
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+
+    if dialect == 'sqlite':
+        rows = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}', params).fetchall()
+        lines = [row[-1] for row in rows]
+        full_scans = [l for l in lines if l.startswith('SCAN ') and ' USING ' not in l]
+        sorts = [l for l in lines if 'TEMP B-TREE' in l]
+    elif dialect == 'mysql':
+        result = conn.exec_driver_sql(f'EXPLAIN {compiled}', params)
+        keys = list(result.keys())
+        rows = [dict(zip(keys, row)) for row in result.fetchall()]
+        lines = [f"{r.get('table')}: type={r.get('type')} key={r.get('key')} extra={r.get('Extra')}" for r in rows]
+        full_scans = [l for l, r in zip(lines, rows) if r.get('type') == 'ALL']
+        sorts = [l for l, r in zip(lines, rows) if 'filesort' in (r.get('Extra') or '')]
+    elif dialect == 'postgresql':
+        rows = conn.exec_driver_sql(f'EXPLAIN {compiled}', params).fetchall()
+        lines = [row[0] for row in rows]
+        full_scans = [l for l in lines if 'Seq Scan' in l]
+        sorts = [l for l in lines if l.strip().startswith('-> Sort') or l.strip().startswith('Sort')]
+    else:
+        raise RuntimeError(f'Unsupported database: {dialect}')
+
+    return lines, full_scans, sorts
+
+
+def audit():
+    print("=" * 80)
+    print("MEMEMASTER INDEX AUDIT")
+    print("=" * 80)
+
+    problems = 0
+    with app.app_context():
+        with db.engine.connect() as conn:
+            print(f"Database: {conn.dialect.name}\n")
+            for route, description, statement, scan_expected in route_queries():
+                try:
+                    lines, full_scans, sorts = explain(conn, statement)
+                except Exception as e:
+                    print(f"❓ {route} ({description}): could not EXPLAIN: {str(e).splitlines()[0]}")
+                    continue
+
+                if full_scans and scan_expected:
+                    status = '✅ batch scan'
+                elif full_scans:
+                    problems += 1
+                    status = '❌ FULL SCAN'
+                elif sorts:
+                    status = '⚠️  SORT'
+                else:
+                    status = '✅ indexed'
+
+                print(f"{status:<14} {route} ({description})")
+                for line in lines:
+                    print(f"{'':<14}   {line}")
+
+    print("\n" + "=" * 80)
+    if problems:
+        print(f"❌ {problems} queries do full table scans. Run: python add_indexes.py")
+    else:
+        print("✅ No full table scans on hot paths")
+    return problems
+
+
+if __name__ == '__main__':
+    sys.exit(1 if audit() else 0)
@@ -0,0 +1,150 @@
+"""
+Benchmark: bytes on the wire and CPU cost of response compression.
+
+For each JSON endpoint, takes an uncompressed response body and compresses
+it with every codec the compression middleware can use, at the level it
+uses (plus a faster and a denser level for comparison). Reports compressed
+size, ratio and CPU milliseconds per response.
+
+Bodies come from a running deployment when a base URL is given:
+    python bench_compression.py https://your-app.example.com
+
+Without one, the app is loaded in-process on an in-memory SQLite database
+seeded with sample user memes and comments; the aggregated feed endpoints
+need upstream APIs, so they are benchmarked on a synthetic feed of the
+same shape:
+    python bench_compression.py
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from compression import compress, available_encodings, LEVELS
+
+ENDPOINTS = ['/api/memes', '/api/trending-memes', '/api/user-memes', '/api/memes/1/comments', '/api/leaderboard']
+REPEATS = 20
+MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', '1024'))
+
+SUBREDDITS = ['dankmemes', 'memes', 'ProgrammerHumor', 'IndianDankMemes', 'HistoryMemes', 'wholesomememes']
+WORDS = 'when the code works on the first try me explaining to my mom why monday hits different'.split()
+
+
+def fetch_remote_bodies(base_url):
+    import requests
+    bodies = {}
+    for path in ENDPOINTS:
+        try:
+            response = requests.get(base_url.rstrip('/') + path, headers={'Accept-Encoding': 'identity'}, timeout=30)
+            response.raise_for_status()
+            bodies[path] = response.content
+        except Exception as e:
+            print(f"⚠️  {path}: {e}, skipping")
+    return bodies
+
+
+def synthetic_feed(count):
+    """Meme dicts shaped like the aggregated feed's"""
+    feed = []
+    for _ in range(count):
+        post_id = ''.join(random.choices('abcdefghijklmnopqrstuvwxyz0123456789', k=7))
+        subreddit = random.choice(SUBREDDITS)
+        feed.append({
+            'id': f'reddit_{post_id}',
+            'title': ' '.join(random.choices(WORDS, k=random.randint(4, 12))),
+            'ups': random.randint(10, 90000),
+            'url': f'https://i.redd.it/{post_id}{random.choice(["q2x", "9zk", "a1m"])}.jpeg',
+            'permalink': f'https://www.reddit.com/r/{subreddit}/comments/{post_id}/',
+            'is_video': False,
+            'source': f'Reddit ({subreddit})',
+        })
+    return feed
+
+
+def local_bodies():
+    os.environ['DATABASE_URL'] = 'sqlite://'
+    from app import app, db, User, UserMeme, Comment, refresh_schema_capabilities
+
+    with app.app_context():
+        db.create_all()
+        for i in range(20):
+            db.session.add(User(email=f'user{i}@example.com', name=f'User {i}',
+                                picture=f'https://lh3.googleusercontent.com/a/user{i}=s96-c'))
+        for i in range(60):
+            db.session.add(UserMeme(user_email=f'user{i % 20}@example.com', image_key=f'{i:064x}.webp',
+                                    title=' '.join(random.choices(WORDS, k=6))))
+        db.session.flush()
+        for i in range(120):
+            db.session.add(Comment(user_email=f'user{i % 20}@example.com', meme_id=1,
+                                   content=' '.join(random.choices(WORDS, k=10))))
+        db.session.commit()
+    refresh_schema_capabilities()
+
+    bodies = {}
+    client = app.test_client()
+    for path in ENDPOINTS[2:]:
+        response = client.get(path)
+        if response.status_code == 200:
+            bodies[path] = response.get_data()
+
+    with app.app_context():
+        bodies['/api/memes (synthetic)'] = app.json.dumps(synthetic_feed(120)).encode('utf-8')
+        bodies['/api/trending-memes (synthetic)'] = app.json.dumps(synthetic_feed(50)).encode('utf-8')
+    return bodies
+
+
+def measure(data, encoding, level):
+    """(compressed size, median CPU ms) over REPEATS runs"""
+    timings = []
+    for _ in range(REPEATS):
+        start = time.process_time()
+        compressed = compress(data, encoding, level)
+        timings.append((time.process_time() - start) * 1000)
+    return len(compressed), statistics.median(timings)
+
+
+def codec_levels():
+    """The middleware's level for each codec, with a faster and a denser one"""
+    alternatives = {'br': (1, 9), 'zstd': (1, 9), 'gzip': (1, 9)}
+    for encoding in available_encodings():
+        fast, dense = alternatives[encoding]
+        for level in sorted({fast, LEVELS[encoding], dense}):
+            yield encoding, level
+
+
+if __name__ == '__main__':
+    print("=" * 72)
+    print("Response Compression Benchmark")
+    print("=" * 72)
+
+    random.seed(42)
+    try:
+        bodies = fetch_remote_bodies(sys.argv[1]) if len(sys.argv) > 1 else local_bodies()
+    except Exception as e:
+        print(f"❌ Could not collect response bodies: {e}")
+        sys.exit(1)
+
+    if not bodies:
+        print("❌ No endpoint returned a body to compress")
+        sys.exit(1)
+
+    missing = {'br', 'zstd', 'gzip'} - set(available_encodings())
+    if missing:
+        print(f"⚠️  Not installed here: {', '.join(sorted(missing))}")
+
+    for path, data in bodies.items():
+        print(f"\n{path}: {len(data):,} bytes uncompressed")
+        if len(data) < MIN_BYTES:
+            print(f"   (below the {MIN_BYTES}-byte threshold; the middleware sends it as-is)")
+        print(f"   {'codec':<10}{'bytes':>10}{'ratio':>9}{'cpu ms':>10}")
+        for encoding, level in codec_levels():
+            size, cpu_ms = measure(data, encoding, level)
+            marker = '  <- middleware' if level == LEVELS[encoding] else ''
+            print(f"   {f'{encoding}-{level}':<10}{size:>10,}{len(data) / size:>8.1f}x{cpu_ms:>10.3f}{marker}")
+
+    print(f"\n✅ Benchmark complete ({REPEATS} runs per codec, median CPU time)")
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Static asset build for MemeMaster.
+
+1. Extracts the inline <style> and <script> blocks from static/index.html into
+   separate files, so they can be cached independently of the page.
+2. Minifies CSS and JS (conservatively: comments and indentation only).
+3. Fingerprints every asset with a content hash (index.3f2a9c1b7d.css).
+4. Writes .gz and, if the brotli package is installed, .br variants next
+   to each file.
+
+Output goes to dist/: the rewritten index.html, dist/assets/ and
+asset-manifest.json. app.py serves dist/ when it exists and the source
+files otherwise.
+
+Usage:
+    python build_assets.py
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(ROOT, 'static')
+SOURCE_HTML = os.path.join(STATIC_DIR, 'index.html')
+STANDALONE_ASSETS = ['script.js', 'style.css']
+DIST_DIR = os.path.join(ROOT, 'dist')
+ASSETS_URL = '/assets/'
+
+# Below this size compression isn't worth a separate file
+MIN_COMPRESS_BYTES = 512
+
+STYLE_RE = re.compile(r'<style>(.*?)</style>', re.DOTALL | re.IGNORECASE)
+INLINE_SCRIPT_RE = re.compile(r'<script>(.*?)</script>', re.DOTALL | re.IGNORECASE)
+CSS_STRING_RE = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')')
+
+
+def minify_css(css):
+    """Drop comments and collapse whitespace outside string literals"""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
+    parts = CSS_STRING_RE.split(css)
+    for i in range(0, len(parts), 2):  # Even indexes are outside strings
+        text = re.sub(r'\s+', ' ', parts[i])
+        text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+        text = re.sub(r':\s+', ':', text)
+        parts[i] = text.replace(';}', '}')
+    return ''.join(parts).strip()
+
+
+def minify_js(js):
+    """Strip indentation, blank lines and whole-line // comments.
+
+    Deliberately line-based: JS syntax (regex literals, ASI) is left alone,
+    and lines inside multi-line template literals are kept verbatim.
+    """
+    output = []
+    in_template = False
+    for line in js.splitlines():
+        if in_template:
+            output.append(line)
+        else:
+            stripped = line.strip()
+            if stripped and not stripped.startswith('//'):
+                output.append(stripped)
+        if (line.count('`') - line.count('\\`')) % 2:
+            in_template = not in_template
+    return '\n'.join(output) + '\n'
+
+
+def fingerprint(data):
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def write_variants(path, data):
+    """Write a file plus its precompressed variants; returns the encodings written"""
+    with open(path, 'wb') as f:
+        f.write(data)
+    encodings = []
+    if len(data) < MIN_COMPRESS_BYTES:
+        return encodings
+
+    gzipped = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gzipped) < len(data):
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzipped)
+        encodings.append('gzip')
+
+    if BROTLI_AVAILABLE:
+        compressed = brotli.compress(data, quality=11)
+        if len(compressed) < len(data):
+            with open(path + '.br', 'wb') as f:
+                f.write(compressed)
+            encodings.append('br')
+    return encodings
+
+
+def emit_asset(manifest, name, data):
+    """Fingerprint and write one asset under dist/assets; returns its URL"""
+    stem, ext = os.path.splitext(name)
+    filename = f'{stem}.{fingerprint(data)}{ext}'
+    encodings = write_variants(os.path.join(DIST_DIR, 'assets', filename), data)
+    manifest[name] = {
+        'file': 'assets/' + filename,
+        'size': len(data),
+        'encodings': encodings,
+    }
+    return ASSETS_URL + filename
+
+
+def build():
+    if os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+    os.makedirs(os.path.join(DIST_DIR, 'assets'))
+
+    manifest = {}
+    with open(SOURCE_HTML, encoding='utf-8') as f:
+        html = f.read()
+
+    style_count = 0
+
+    def replace_style(match):
+        nonlocal style_count
+        name = 'index.css' if style_count == 0 else f'index-{style_count}.css'
+        style_count += 1
+        url = emit_asset(manifest, name, minify_css(match.group(1)).encode('utf-8'))
+        return f'<link rel="stylesheet" href="{url}">'
+
+    script_count = 0
+
+    def replace_script(match):
+        nonlocal script_count
+        name = 'index.js' if script_count == 0 else f'index-{script_count}.js'
+        script_count += 1
+        # External scripts keep their position, so execution order is unchanged
+        url = emit_asset(manifest, name, minify_js(match.group(1)).encode('utf-8'))
+        return f'<script src="{url}"></script>'
+
+    html = STYLE_RE.sub(replace_style, html)
+    html = INLINE_SCRIPT_RE.sub(replace_script, html)
+
+    for name in STANDALONE_ASSETS:
+        path = os.path.join(STATIC_DIR, name)
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+        minified = minify_css(source) if name.endswith('.css') else minify_js(source)
+        emit_asset(manifest, name, minified.encode('utf-8'))
+
+    # The page itself is not fingerprinted (its URL is /), only revalidated
+    page = html.encode('utf-8')
+    manifest['index.html'] = {
+        'file': 'index.html',
+        'size': len(page),
+        'encodings': write_variants(os.path.join(DIST_DIR, 'index.html'), page),
+    }
+
+    with open(os.path.join(DIST_DIR, 'asset-manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+if __name__ == '__main__':
+    print("=" * 50)
+    print("MemeMaster Asset Build")
+    print("=" * 50)
+
+    if not BROTLI_AVAILABLE:
+        print("⚠️  brotli not installed; only gzip variants will be written")
+
+    try:
+        manifest = build()
+    except Exception as e:
+        print(f"❌ Build failed: {e}")
+        sys.exit(1)
+
+    for name, entry in sorted(manifest.items()):
+        print(f"✅ {name:<14} -> {entry['file']:<32} {entry['size']:>8} bytes  {', '.join(entry['encodings'])}")
+    print(f"\n✅ Build complete! Wrote {len(manifest)} assets to dist/")
@@ -0,0 +1,248 @@
+"""
+WSGI middleware that compresses text responses (JSON, HTML, CSS, JS).
+
+The encoding is negotiated from Accept-Encoding: Brotli, then zstd, then
+gzip, limited to the codecs installed here. Responses are left alone when
+they are small (below min_size), already encoded (precompressed assets,
+proxied media), not a compressible type, partial (206) or marked
+no-transform.
+
+Bodies with a known length up to buffer_limit are compressed in one go and
+sent with a Content-Length. Larger or streamed bodies are compressed chunk
+by chunk as the app produces them, without holding the whole body.
+
+brotli and zstandard are optional; gzip is always available.
+"""
+
+import zlib
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+COMPRESSIBLE_TYPES = (
+    'application/json', 'application/javascript', 'application/xml',
+    'image/svg+xml', 'text/',
+)
+
+# Levels chosen for on-the-fly compression: good ratio, low CPU per request
+LEVELS = {'br': 5, 'zstd': 3, 'gzip': 6}
+
+
+def available_encodings():
+    """Encodings this process can produce, in order of preference"""
+    encodings = []
+    if BROTLI_AVAILABLE:
+        encodings.append('br')
+    if ZSTD_AVAILABLE:
+        encodings.append('zstd')
+    encodings.append('gzip')
+    return encodings
+
+
+class _Compressor:
+    """Uniform compress(chunk) / finish() interface over the three codecs"""
+
+    def __init__(self, encoding, level=None):
+        level = LEVELS[encoding] if level is None else level
+        self.encoding = encoding
+        if encoding == 'br':
+            self._obj = brotli.Compressor(quality=level)
+            self._compress, self._finish = self._obj.process, self._obj.finish
+        elif encoding == 'zstd':
+            self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+            self._compress, self._finish = self._obj.compress, self._obj.flush
+        else:
+            self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+            self._compress, self._finish = self._obj.compress, self._obj.flush
+
+    def compress(self, data):
+        return self._compress(data)
+
+    def finish(self):
+        return self._finish()
+
+
+def compress(data, encoding, level=None):
+    compressor = _Compressor(encoding, level)
+    return compressor.compress(data) + compressor.finish()
+
+
+def negotiate(accept_encoding, offered):
+    """Pick the first offered encoding the client accepts with q > 0"""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name] = quality
+
+    wildcard = accepted.get('*', 0.0)
+    for encoding in offered:
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+class CompressionMiddleware:
+    """Negotiated gzip/br/zstd compression for a WSGI app"""
+
+    def __init__(self, app, min_size=1024, buffer_limit=1024 * 1024, encodings=None):
+        self.app = app
+        self.min_size = min_size
+        self.buffer_limit = buffer_limit
+        self.encodings = encodings or available_encodings()
+        self.compressed_responses = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def __call__(self, environ, start_response):
+        if environ.get('REQUEST_METHOD') == 'HEAD':
+            return self.app(environ, start_response)
+        encoding = negotiate(environ.get('HTTP_ACCEPT_ENCODING'), self.encodings)
+        return _CompressedResponse(self, environ, start_response, encoding).run()
+
+    def _eligible(self, status, headers):
+        """None if the response must pass through, else its Content-Length (or -1)"""
+        code = int(status.split(' ', 1)[0])
+        if code < 200 or code in (204, 206, 304):
+            return None
+
+        values = {name.lower(): value for name, value in headers}
+        if 'content-encoding' in values:
+            return None
+        if 'no-transform' in values.get('cache-control', '').lower():
+            return None
+        content_type = values.get('content-type', '').split(';')[0].strip().lower()
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return None
+
+        length = values.get('content-length')
+        if length is None:
+            return -1
+        length = int(length)
+        return length if length >= self.min_size else None
+
+    def stats(self):
+        return {
+            'encodings': self.encodings,
+            'compressed_responses': self.compressed_responses,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+        }
+
+
+class _CompressedResponse:
+    """One request: decides in start_response, then wraps the body iterable"""
+
+    def __init__(self, middleware, environ, start_response, encoding):
+        self.middleware = middleware
+        self.environ = environ
+        self.start_response = start_response
+        self.encoding = encoding
+        self.mode = 'passthrough'  # or 'buffer' / 'stream'
+        self.pending = None  # (status, headers, exc_info) for buffered bodies
+        self.written = []  # Data passed to write() before a buffered body
+
+    def _start(self, status, headers, exc_info=None):
+        length = self.middleware._eligible(status, headers)
+        if length is None:
+            return self.start_response(status, headers, exc_info)
+
+        headers = self._add_vary(headers)
+        if self.encoding is None:
+            return self.start_response(status, headers, exc_info)
+
+        headers = [(name, value) for name, value in headers if name.lower() != 'content-length']
+        headers.append(('Content-Encoding', self.encoding))
+        headers = [(name, self._weaken(value) if name.lower() == 'etag' else value) for name, value in headers]
+
+        if 0 <= length <= self.middleware.buffer_limit:
+            # Sent once the body is compressed, so it can carry a Content-Length
+            self.mode = 'buffer'
+            self.pending = (status, headers, exc_info)
+            return self._buffered_write
+        self.mode = 'stream'
+        return self.start_response(status, headers, exc_info)
+
+    @staticmethod
+    def _add_vary(headers):
+        for i, (name, value) in enumerate(headers):
+            if name.lower() == 'vary':
+                if 'accept-encoding' not in value.lower():
+                    headers = list(headers)
+                    headers[i] = (name, f'{value}, Accept-Encoding')
+                return headers
+        return list(headers) + [('Vary', 'Accept-Encoding')]
+
+    @staticmethod
+    def _weaken(etag):
+        # The encoded body is a different representation of the same resource.
+        # 304s pass through untouched, so apps whose compressible responses can
+        # be revalidated should issue weak ETags themselves (response_cache,
+        # static_assets) to keep the 200 and 304 validators identical.
+        return etag if etag.startswith('W/') else 'W/' + etag
+
+    def _buffered_write(self, data):
+        self.written.append(data)
+
+    def run(self):
+        body = self.middleware.app(self.environ, self._start)
+        if self.mode == 'passthrough':
+            return body
+        if self.mode == 'buffer':
+            return self._buffer(body)
+        return self._stream(body)
+
+    def _buffer(self, body):
+        try:
+            data = b''.join(self.written) + b''.join(body)
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+        compressed = compress(data, self.encoding)
+        status, headers, exc_info = self.pending
+        headers.append(('Content-Length', str(len(compressed))))
+        self.start_response(status, headers, exc_info)
+        self._record(len(data), len(compressed))
+        return [compressed]
+
+    def _stream(self, body):
+        compressor = _Compressor(self.encoding)
+        size_in = size_out = 0
+        try:
+            for chunk in body:
+                size_in += len(chunk)
+                out = compressor.compress(chunk)
+                if out:
+                    size_out += len(out)
+                    yield out
+            out = compressor.finish()
+            size_out += len(out)
+            yield out
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+        self._record(size_in, size_out)
+
+    def _record(self, size_in, size_out):
+        middleware = self.middleware
+        middleware.compressed_responses += 1
+        middleware.bytes_in += size_in
+        middleware.bytes_out += size_out
@@ -51,8 +51,35 @@ if __name__ == "__main__":
     # List of files to sync
     files_to_sync = [
         ('app.py', 'app.py'),
-        ('index.html', 'index.html'),
+        ('asgi.py', 'asgi.py'),
+        ('meme_ingest.py', 'meme_ingest.py'),
+        ('meme_fanout.py', 'meme_fanout.py'),
+        ('meme_dedup.py', 'meme_dedup.py'),
+        ('feed_ranking.py', 'feed_ranking.py'),
+        ('perceptual_hash.py', 'perceptual_hash.py'),
+        ('swr_cache.py', 'swr_cache.py'),
+        ('http_client.py', 'http_client.py'),
+        ('quiz_pool.py', 'quiz_pool.py'),
+        ('media_store.py', 'media_store.py'),
+        ('image_pipeline.py', 'image_pipeline.py'),
+        ('write_behind.py', 'write_behind.py'),
+        ('proxy_cache.py', 'proxy_cache.py'),
+        ('proxy_governor.py', 'proxy_governor.py'),
+        ('static/index.html', 'static/index.html'),
+        ('static/script.js', 'static/script.js'),
+        ('static/style.css', 'static/style.css'),
+        ('static_assets.py', 'static_assets.py'),
+        ('response_cache.py', 'response_cache.py'),
+        ('json_provider.py', 'json_provider.py'),
+        ('compression.py', 'compression.py'),
         ('requirements.txt', 'requirements.txt'),
+        ('migrate.py', 'migrate.py'),
+        ('rebuild_leaderboard.py', 'rebuild_leaderboard.py'),
+        ('add_indexes.py', 'add_indexes.py'),
+        ('audit_indexes.py', 'audit_indexes.py'),
+        ('migrate_media_storage.py', 'migrate_media_storage.py'),
+        ('migrate_image_variants.py', 'migrate_image_variants.py'),
+        ('migrate_phash.py', 'migrate_phash.py'),
         ('add_login_history_table.py', 'add_login_history_table.py'),
         ('check_user_table.py', 'check_user_table.py'),
         ('verify_deployment.py', 'verify_deployment.py'),
@@ -60,6 +87,15 @@ if __name__ == "__main__":
         ('test_bypass.py', 'test_bypass.py')
     ]
     
+    # Built assets (python build_assets.py), served by app.py when present
+    if os.path.isdir('dist'):
+        for root, _, names in os.walk('dist'):
+            for name in sorted(names):
+                local = os.path.join(root, name)
+                files_to_sync.append((local, local.replace(os.sep, '/')))
+    else:
+        print("⚠️ dist/ not found; run build_assets.py to deploy minified assets")
+    
     for local, remote in files_to_sync:
         if os.path.exists(local):
             upload_file(local, remote)
@@ -68,3 +104,4 @@ if __name__ == "__main__":
             
     reload_webapp()
     print("✨ Deployment Complete!")
+    print("👉 Run 'python migrate.py' in a PythonAnywhere console, then reload, to apply schema changes")
@@ -0,0 +1,164 @@
+"""
+Ranking for the aggregated meme feed.
+
+Every candidate in the cached pool gets a score from three vectorized
+NumPy features:
+
+- popularity: log upvotes, normalized within each source family, since a
+  "hot" post on one source may have a tenth of the upvotes of another;
+- recency: exponential decay since the meme first entered the pool;
+- affinity: how much the user favors the meme's source, taken from their
+  saved favorites and bucketed into a small number of user segments.
+
+Scores are cached per (pool version, segment) for a short window. Each
+request then draws its page with Gumbel-top-k sampling over the scores,
+so better memes come first but "Load More" still returns fresh items.
+
+NumPy is optional: without it the feed falls back to a random sample.
+"""
+
+import math
+import random
+import threading
+import time
+from collections import Counter, OrderedDict
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+def source_family(source):
+    """'Reddit (dankmemes)' -> 'Reddit'"""
+    return (source or 'Unknown').split(' (')[0].strip()
+
+
+def favorite_segment(source_counts):
+    """Map {favorite source: count} to (segment, {family: affinity}).
+
+    The segment is the user's top two source families, so all users who
+    mostly save Reddit and 9GAG memes share one cached ranking.
+    """
+    families = Counter()
+    for source, count in source_counts.items():
+        families[source_family(source)] += count
+    top = tuple(family for family, _ in families.most_common(2))
+    affinity = {family: weight for family, weight in zip(top, (1.0, 0.5))}
+    return top, affinity
+
+
+class FeedRanker:
+    """Scores a candidate pool and draws ranked pages from it"""
+
+    def __init__(self, half_life=6 * 3600, ups_weight=1.0, recency_weight=1.0, affinity_weight=0.75,
+                 temperature=0.35, cache_ttl=60, max_cached=128, max_tracked=50000):
+        self.half_life = half_life
+        self.ups_weight = ups_weight
+        self.recency_weight = recency_weight
+        self.affinity_weight = affinity_weight
+        self.temperature = temperature
+        self.cache_ttl = cache_ttl
+        self.max_cached = max_cached
+        self.max_tracked = max_tracked
+        self.enabled = NUMPY_AVAILABLE
+        self._lock = threading.Lock()
+        self._first_seen = OrderedDict()  # meme id -> first time it was ranked
+        self._features = None  # (version, features)
+        self._scores = OrderedDict()  # (version, segment, time bucket) -> scores
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _stamp(self, memes, now):
+        """First-seen times for memes (upstream APIs don't give post times)"""
+        stamps = []
+        for meme in memes:
+            key = meme.get('id') or meme.get('url')
+            seen = self._first_seen.get(key)
+            if seen is None:
+                seen = self._first_seen[key] = now
+                if len(self._first_seen) > self.max_tracked:
+                    self._first_seen.popitem(last=False)
+            stamps.append(seen)
+        return np.array(stamps, dtype=np.float64)
+
+    def _build_features(self, memes, now):
+        families, family_index = np.unique([source_family(m.get('source')) for m in memes], return_inverse=True)
+        ups = np.log1p(np.clip(np.array([m.get('ups') or 0 for m in memes], dtype=np.float64), 0, None))
+
+        # z-score upvotes within each source family, squashed into [-1, 1]
+        counts = np.bincount(family_index, minlength=len(families))
+        means = np.bincount(family_index, weights=ups, minlength=len(families)) / counts
+        variances = np.bincount(family_index, weights=(ups - means[family_index]) ** 2, minlength=len(families)) / counts
+        stds = np.sqrt(variances)
+        stds[stds == 0] = 1.0
+        popularity = np.tanh((ups - means[family_index]) / stds[family_index] / 2)
+
+        return {
+            'families': list(families),
+            'family_index': family_index,
+            'popularity': popularity,
+            'first_seen': self._stamp(memes, now),
+        }
+
+    def _compute_scores(self, features, affinity, now):
+        age = np.maximum(0.0, now - features['first_seen'])
+        recency = np.exp(-math.log(2) * age / self.half_life)
+        family_affinity = np.array([affinity.get(family, 0.0) for family in features['families']])
+        return (self.ups_weight * features['popularity']
+                + self.recency_weight * recency
+                + self.affinity_weight * family_affinity[features['family_index']])
+
+    def scores(self, memes, version=None, segment=(), affinity=None):
+        """Score every meme; cached per (version, segment) when version is given"""
+        now = time.time()
+        affinity = affinity or {}
+        with self._lock:
+            if version is None:
+                return self._compute_scores(self._build_features(memes, now), affinity, now)
+
+            cache_key = (version, segment, int(now // self.cache_ttl))
+            cached = self._scores.get(cache_key)
+            if cached is not None:
+                self._scores.move_to_end(cache_key)
+                self.cache_hits += 1
+                return cached
+
+            self.cache_misses += 1
+            if self._features is None or self._features[0] != version:
+                self._features = (version, self._build_features(memes, now))
+            scores = self._compute_scores(self._features[1], affinity, now)
+            self._scores[cache_key] = scores
+            while len(self._scores) > self.max_cached:
+                self._scores.popitem(last=False)
+            return scores
+
+    def rank(self, memes, limit, version=None, segment=(), affinity=None):
+        """Return up to limit memes, best first, with some randomness between calls"""
+        if not memes:
+            return []
+        if not self.enabled:
+            return random.sample(memes, min(limit, len(memes)))
+
+        scores = self.scores(memes, version=version, segment=segment, affinity=affinity)
+        if self.temperature > 0:
+            # Gumbel-top-k: sampling without replacement, weighted by softmax(score / T)
+            keys = scores / self.temperature + np.random.default_rng().gumbel(size=len(scores))
+        else:
+            keys = scores
+
+        k = min(limit, len(memes))
+        top = np.argpartition(-keys, k - 1)[:k]
+        order = top[np.argsort(-keys[top])]
+        return [memes[i] for i in order]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'tracked_memes': len(self._first_seen),
+                'cached_rankings': len(self._scores),
+                'cache_hits': self.cache_hits,
+                'cache_misses': self.cache_misses,
+            }
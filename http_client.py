@@ -0,0 +1,81 @@
+"""
+Shared pooled HTTP client for all outbound calls.
+
+One requests.Session is reused across threads so TCP/TLS connections to
+meme-api.com, reddit.com and friends stay alive between calls. Idempotent
+GETs are retried with exponential backoff, and each upstream gets its own
+(connect, read) timeout budget.
+"""
+
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connect, read) timeouts in seconds per upstream
+HTTP_TIMEOUTS = {
+    'default': (3.05, 10),
+    'meme-api': (3.05, 5),
+    'reddit': (3.05, 5),
+    'imgflip': (3.05, 5),
+    'audio': (3.05, 10),
+    'download': (5, 30),
+}
+
+HTTP_POOL_HOSTS = int(os.environ.get('HTTP_POOL_HOSTS', '16'))
+HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', '16'))
+HTTP_RETRIES = int(os.environ.get('HTTP_RETRIES', '2'))
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _build_session():
+    retry = Retry(
+        total=HTTP_RETRIES,
+        connect=HTTP_RETRIES,
+        read=1,
+        status=HTTP_RETRIES,
+        backoff_factor=0.3,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_HOSTS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'User-Agent': 'MemeQuizApp/1.0'})
+    return session
+
+
+def get_session():
+    """Return the process-wide pooled session, creating it on first use"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def http_get(url, source='default', timeout=None, **kwargs):
+    """GET through the shared session using the source's timeout budget"""
+    if timeout is None:
+        timeout = HTTP_TIMEOUTS.get(source, HTTP_TIMEOUTS['default'])
+    return get_session().get(url, timeout=timeout, **kwargs)
+
+
+def iter_content_and_close(response, chunk_size=8192):
+    """Stream a response body and release its connection back to the pool"""
+    try:
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            yield chunk
+    finally:
+        response.close()
@@ -0,0 +1,95 @@
+"""
+Image processing for user-posted memes.
+
+Canvas uploads arrive as large lossless PNGs. After the upload is stored,
+a background worker pool re-encodes it into a compressed full-size image
+and a fixed-size thumbnail for the community grid, writes both to the media
+store and reports the new keys through a callback.
+
+Pillow is optional: without it uploads are served as-is.
+"""
+
+import io
+import concurrent.futures
+
+try:
+    from PIL import Image, ImageOps, features
+    PILLOW_AVAILABLE = True
+except ImportError:
+    PILLOW_AVAILABLE = False
+
+FULL_MAX_SIZE = 2048
+THUMBNAIL_SIZE = 480
+WEBP_QUALITY = 82
+JPEG_QUALITY = 85
+
+
+def _encode(image, quality_webp=WEBP_QUALITY, quality_jpeg=JPEG_QUALITY):
+    """Encode as WebP when supported, otherwise JPEG; returns (bytes, content_type)"""
+    buffer = io.BytesIO()
+    if features.check('webp'):
+        image.save(buffer, 'WEBP', quality=quality_webp, method=4)
+        return buffer.getvalue(), 'image/webp'
+
+    if image.mode not in ('RGB', 'L'):
+        # JPEG has no alpha; flatten onto white like the canvas background
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.convert('RGBA').split()[-1])
+        image = background
+    image.save(buffer, 'JPEG', quality=quality_jpeg, optimize=True, progressive=True)
+    return buffer.getvalue(), 'image/jpeg'
+
+
+def transcode(image_bytes):
+    """Return {'full': (bytes, type), 'thumb': (bytes, type)} for an uploaded image"""
+    with Image.open(io.BytesIO(image_bytes)) as source:
+        source.load()
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ('RGB', 'RGBA', 'L'):
+            has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+            image = image.convert('RGBA' if has_alpha else 'RGB')
+
+        full = image.copy()
+        full.thumbnail((FULL_MAX_SIZE, FULL_MAX_SIZE), Image.LANCZOS)
+
+        thumb = image.copy()
+        thumb.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.LANCZOS)
+
+    return {
+        'full': _encode(full),
+        'thumb': _encode(thumb, quality_webp=75, quality_jpeg=80),
+    }
+
+
+class ImagePipeline:
+    """Runs transcoding off the request thread and stores the variants"""
+
+    def __init__(self, store, on_done, max_workers=2):
+        self.store = store
+        self.on_done = on_done
+        self.enabled = PILLOW_AVAILABLE
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='image-pipeline'
+        )
+        if not self.enabled:
+            print("⚠️  Pillow not installed; posted memes will not be transcoded")
+
+    def process(self, meme_id, image_key):
+        """Transcode synchronously and return {'full': key, 'thumb': key}"""
+        variants = transcode(self.store.read(image_key))
+        keys = {name: self.store.put(data, ctype) for name, (data, ctype) in variants.items()}
+        self.on_done(meme_id, keys)
+        return keys
+
+    def submit(self, meme_id, image_key):
+        """Queue a meme for background transcoding"""
+        if not self.enabled:
+            return None
+        future = self._executor.submit(self.process, meme_id, image_key)
+        future.add_done_callback(lambda f: self._report(meme_id, f))
+        return future
+
+    def _report(self, meme_id, future):
+        error = future.exception()
+        if error is not None:
+            print(f"❌ Image processing failed for meme {meme_id}: {error}")
@@ -0,0 +1,76 @@
+"""
+Fast JSON provider for Flask.
+
+jsonify() goes through app.json; this provider serializes with orjson,
+which writes bytes directly and is several times faster than the stdlib
+encoder on the large feed and user-meme payloads. datetimes are emitted
+as ISO 8601 strings (Flask's default is an HTTP date), so views can put
+datetime columns straight into their response dicts.
+
+orjson is optional: without it the stdlib encoder is used with the same
+ISO 8601 datetime handling, so responses look the same either way.
+"""
+
+import decimal
+from datetime import date
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _default(o):
+    """Types neither encoder handles natively (mirrors Flask's, minus http_date)"""
+    if isinstance(o, date):
+        return o.isoformat()
+    if isinstance(o, decimal.Decimal):
+        return str(o)
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    return DefaultJSONProvider.default(o)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """orjson-backed provider; falls back to the stdlib encoder per call"""
+
+    default = staticmethod(_default)
+
+    def _options(self, pretty=False):
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if pretty:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        # Custom encoder arguments (cls, separators, ...) need the stdlib encoder
+        if ORJSON_AVAILABLE and not kwargs:
+            try:
+                return orjson.dumps(obj, default=_default, option=self._options()).decode('utf-8')
+            except TypeError:
+                pass  # e.g. integers wider than 64 bits
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if ORJSON_AVAILABLE and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if not ORJSON_AVAILABLE:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        try:
+            body = orjson.dumps(obj, default=_default, option=self._options(pretty) | orjson.OPT_APPEND_NEWLINE)
+        except TypeError:
+            return super().response(obj)
+        return self._app.response_class(body, mimetype=self.mimetype)
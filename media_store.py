@@ -0,0 +1,142 @@
+"""
+Media storage for user-posted memes.
+
+Images are stored once as raw bytes under a content-addressed key
+(sha256 of the bytes plus an extension), so identical uploads share one
+blob and keys never change meaning. Backends are pluggable; the local
+filesystem backend shards files into two levels of subdirectories.
+"""
+
+import os
+import re
+import base64
+import hashlib
+import tempfile
+from abc import ABC, abstractmethod
+
+CONTENT_TYPE_EXTENSIONS = {
+    'image/png': 'png',
+    'image/jpeg': 'jpg',
+    'image/webp': 'webp',
+    'image/gif': 'gif',
+}
+EXTENSION_CONTENT_TYPES = {ext: ctype for ctype, ext in CONTENT_TYPE_EXTENSIONS.items()}
+
+KEY_PATTERN = re.compile(r'^[0-9a-f]{64}\.(png|jpg|webp|gif)$')
+DATA_URL_PATTERN = re.compile(r'^data:(?P<ctype>[\w/+.-]+);base64,(?P<data>.*)$', re.DOTALL)
+
+
+class MediaError(ValueError):
+    """Raised for uploads that can't be decoded or stored"""
+
+
+def decode_data_url(data_url, max_bytes=None):
+    """Decode a base64 data URL into (bytes, content_type)"""
+    match = DATA_URL_PATTERN.match(data_url or '')
+    if not match:
+        raise MediaError('Image must be a base64 data URL')
+
+    content_type = match.group('ctype').lower()
+    if content_type not in CONTENT_TYPE_EXTENSIONS:
+        raise MediaError(f'Unsupported image type: {content_type}')
+
+    # Reject obviously oversized payloads before decoding them
+    if max_bytes and len(match.group('data')) * 3 // 4 > max_bytes:
+        raise MediaError('Image is too large')
+
+    try:
+        data = base64.b64decode(match.group('data'), validate=True)
+    except ValueError:
+        raise MediaError('Image data is not valid base64')
+    return data, content_type
+
+
+def content_type_for_key(key):
+    return EXTENSION_CONTENT_TYPES.get(key.rsplit('.', 1)[-1], 'application/octet-stream')
+
+
+class MediaStore(ABC):
+    """Interface for media backends"""
+
+    @abstractmethod
+    def put(self, data, content_type):
+        """Store bytes and return their key"""
+
+    @abstractmethod
+    def exists(self, key):
+        """Whether a blob is stored under key"""
+
+    @abstractmethod
+    def read(self, key):
+        """Bytes stored under key"""
+
+    @abstractmethod
+    def delete(self, key):
+        """Remove the blob under key, if any"""
+
+    def local_path(self, key):
+        """Filesystem path for key, or None if the backend isn't file based"""
+        return None
+
+    def url(self, key):
+        """Public URL the frontend should use for key"""
+        return f'/media/{key}'
+
+    @staticmethod
+    def make_key(data, content_type):
+        return f'{hashlib.sha256(data).hexdigest()}.{CONTENT_TYPE_EXTENSIONS[content_type]}'
+
+
+class LocalMediaStore(MediaStore):
+    """Content-addressed blobs on the local filesystem"""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def local_path(self, key):
+        if not KEY_PATTERN.match(key):
+            raise MediaError(f'Invalid media key: {key}')
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def put(self, data, content_type):
+        key = self.make_key(data, content_type)
+        path = self.local_path(key)
+        if os.path.exists(path):
+            return key
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename so readers never see partial files
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return key
+
+    def exists(self, key):
+        return os.path.exists(self.local_path(key))
+
+    def read(self, key):
+        with open(self.local_path(key), 'rb') as f:
+            return f.read()
+
+    def delete(self, key):
+        path = self.local_path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+MEDIA_BACKENDS = {
+    'local': LocalMediaStore,
+}
+
+
+def create_media_store(backend='local', **options):
+    """Instantiate a registered media backend by name"""
+    if backend not in MEDIA_BACKENDS:
+        raise MediaError(f'Unknown media backend: {backend}')
+    return MEDIA_BACKENDS[backend](**options)
@@ -0,0 +1,223 @@
+"""
+Cross-source de-duplication for the aggregated meme feed.
+
+Several fetchers pull from overlapping upstreams (meme-api.com subreddits,
+Reddit's own JSON), so the same post can arrive under different id prefixes
+and slightly different media URLs. Each meme is reduced to a few identity
+keys (normalized media URL and Reddit post id); two memes sharing any key
+are the same meme and only one copy is kept.
+
+A bounded rolling seen-set (a two-generation Bloom filter in front of an
+LRU of key -> owning source) remembers which source first delivered each
+meme, so the same copy keeps winning as sources refresh at different times.
+
+Memes that carry a perceptual hash ('phash') are also collapsed when their
+hashes are within near_distance bits, which catches re-encoded reposts.
+"""
+
+import hashlib
+import math
+import re
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+from perceptual_hash import BKTree, NEAR_DUPLICATE_DISTANCE
+
+# Post ids in reddit permalinks (/comments/<id>/) and redd.it short links (not v.redd.it)
+REDDIT_POST_RE = re.compile(r'(?:/comments/|(?:^|//)redd\.it/)([a-z0-9]+)', re.IGNORECASE)
+REDDIT_ID_PREFIXES = ('reddit_vid_', 'reddit_')
+
+# Resized/signed copies of the same Reddit upload
+REDDIT_PREVIEW_HOSTS = ('preview.redd.it', 'external-preview.redd.it')
+
+
+def normalize_media_url(url):
+    """Reduce a media URL to host + path, folding known CDN variants together"""
+    if not url:
+        return None
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if not host:
+        return None
+    path = parts.path.rstrip('/')
+
+    if host in REDDIT_PREVIEW_HOSTS:
+        host = 'i.redd.it'
+    elif host == 'v.redd.it':
+        # v.redd.it/<id>/DASH_720.mp4 and DASH_480.mp4 are the same video
+        path = '/' + path.strip('/').split('/')[0]
+    elif host in ('imgur.com', 'i.imgur.com'):
+        host = 'i.imgur.com'
+        path = path.rsplit('.', 1)[0]
+
+    return f'{host}{path}'
+
+
+def normalize_post_link(link):
+    """Reddit permalinks and redd.it links become reddit:<post id>"""
+    if not link:
+        return None
+    match = REDDIT_POST_RE.search(link)
+    if match:
+        return 'reddit:' + match.group(1).lower()
+    return normalize_media_url(link)
+
+
+def meme_keys(meme):
+    """Identity keys for one meme dict; memes sharing any key are duplicates"""
+    keys = set()
+    media = normalize_media_url(meme.get('url'))
+    if media:
+        keys.add('u:' + media)
+
+    for field in ('permalink', 'postLink'):
+        post = normalize_post_link(meme.get(field))
+        if post:
+            keys.add('p:' + post)
+
+    meme_id = str(meme.get('id') or '')
+    for prefix in REDDIT_ID_PREFIXES:
+        if meme_id.startswith(prefix):
+            keys.add('p:reddit:' + meme_id[len(prefix):].lower())
+            break
+    return keys
+
+
+def unique_memes(memes):
+    """Drop later copies of memes already present earlier in the list"""
+    seen = set()
+    result = []
+    for meme in memes:
+        keys = meme_keys(meme)
+        if keys & seen:
+            continue
+        seen.update(keys)
+        result.append(meme)
+    return result
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings"""
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.size = max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class RollingSeenSet:
+    """Bounded memory of which source first delivered each key.
+
+    The Bloom filter answers "never seen" without touching the LRU; it is
+    rotated (current -> previous) every `capacity` insertions so it never
+    fills up. The LRU holds the exact owners of the most recent keys.
+    """
+
+    def __init__(self, capacity=20000):
+        self.capacity = capacity
+        self._current = BloomFilter(capacity)
+        self._previous = None
+        self._owners = OrderedDict()
+
+    def _maybe_seen(self, key):
+        return key in self._current or (self._previous is not None and key in self._previous)
+
+    def owner(self, keys):
+        """Return the recorded owner for any of keys, or None"""
+        for key in keys:
+            if self._maybe_seen(key):
+                owner = self._owners.get(key)
+                if owner is not None:
+                    self._owners.move_to_end(key)
+                    return owner
+        return None
+
+    def claim(self, keys, source):
+        """Record source as the owner of keys that have none; returns the owner"""
+        owner = self.owner(keys) or source
+        for key in keys:
+            if not self._maybe_seen(key):
+                self._current.add(key)
+                if self._current.count >= self.capacity:
+                    self._previous, self._current = self._current, BloomFilter(self.capacity)
+            self._owners[key] = owner
+            self._owners.move_to_end(key)
+        while len(self._owners) > self.capacity:
+            self._owners.popitem(last=False)
+        return owner
+
+    def __len__(self):
+        return len(self._owners)
+
+
+class CrossSourceDeduper:
+    """Merges per-source meme lists into one feed with one copy of each meme"""
+
+    def __init__(self, capacity=20000, near_distance=NEAR_DUPLICATE_DISTANCE):
+        self.seen = RollingSeenSet(capacity)
+        self.near_distance = near_distance
+        self._lock = threading.Lock()
+        self.last_input = 0
+        self.last_output = 0
+        self.duplicates_dropped = 0
+        self.near_duplicates_dropped = 0
+
+    def merge(self, groups):
+        """groups: iterable of (source_name, memes); returns the combined feed"""
+        with self._lock:
+            candidates = []
+            for source, memes in groups:
+                for meme in memes:
+                    keys = meme_keys(meme)
+                    owner = self.seen.claim(keys, source)
+                    candidates.append((owner != source, meme, keys))
+
+            # The copy from the source that first delivered a meme wins; other
+            # copies only survive if the owner no longer carries it
+            candidates.sort(key=lambda candidate: candidate[0])
+            taken = set()
+            hashes = BKTree()
+            feed = []
+            for _, meme, keys in candidates:
+                if keys & taken:
+                    self.duplicates_dropped += 1
+                    continue
+                phash = meme.get('phash')
+                if phash and self.near_distance >= 0:
+                    if hashes.search(phash, self.near_distance):
+                        self.near_duplicates_dropped += 1
+                        continue
+                    hashes.add(phash, meme.get('id'))
+                taken.update(keys)
+                feed.append(meme)
+
+            self.last_input = len(candidates)
+            self.last_output = len(feed)
+            return feed
+
+    def stats(self):
+        return {
+            'last_input': self.last_input,
+            'last_output': self.last_output,
+            'duplicates_dropped': self.duplicates_dropped,
+            'near_duplicates_dropped': self.near_duplicates_dropped,
+            'tracked_keys': len(self.seen),
+        }
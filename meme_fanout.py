@@ -0,0 +1,136 @@
+"""
+Fan-out engine for multi-source meme aggregation.
+
+Sources are plain blocking fetch functions that share the pooled HTTP
+client from http_client.py. The engine submits all of them at once to a
+shared bounded executor, waits on the futures under one global deadline,
+and returns whatever arrived in time. Stragglers keep running and can be
+handed to an on_late callback (e.g. to warm a cache) instead of holding up
+the response.
+
+Tasks submitted under a group are shared while in flight: a fan-out that
+asks for a (group, name) another request is already fetching waits on that
+fetch instead of starting a second one, so a stalled source ties up one
+worker rather than one per request. Submissions beyond max_pending are
+skipped rather than queued behind stalled work.
+
+Why threads and not asyncio: the callers are sync Flask views, and the
+sources are the same blocking functions the background ingestor runs
+(requests via http_client.py, cloudscraper for the Reddit bypass), which
+have no async equivalent. On asyncio each source would still run in
+asyncio.to_thread, plus an event loop built and torn down per request, so
+the loop added cost and no concurrency. The goal is still met: every
+source and subreddit is fetched at once over the shared connection pool,
+and the response waits for one global deadline, not the slowest source.
+A fan-out is a handful of tasks, so FANOUT_WORKERS threads are not the
+limit that sockets on an event loop would lift. Long-lived streams, where
+that limit does matter, run on httpx.AsyncClient in asgi.py.
+"""
+
+import os
+import threading
+import time
+import concurrent.futures
+
+FANOUT_WORKERS = int(os.environ.get('FANOUT_WORKERS', '16'))
+# Running plus queued tasks; past this, new work is skipped instead of queued
+FANOUT_MAX_PENDING = int(os.environ.get('FANOUT_MAX_PENDING', str(FANOUT_WORKERS * 2)))
+
+_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=FANOUT_WORKERS, thread_name_prefix='meme-fanout'
+)
+_lock = threading.Lock()
+_inflight = {}  # (group, name) -> Future, for grouped tasks
+_pending = 0
+
+
+def _finished(key, future):
+    global _pending
+    with _lock:
+        _pending -= 1
+        if key is not None and _inflight.get(key) is future:
+            del _inflight[key]
+
+
+def _submit(group, name, fn):
+    """Future for this task: the in-flight one for its key, a new one, or None if full"""
+    global _pending
+    key = (group, name) if group is not None else None
+    with _lock:
+        if key is not None and key in _inflight:
+            return _inflight[key]
+        if _pending >= FANOUT_MAX_PENDING:
+            return None
+        _pending += 1
+        future = _executor.submit(fn)
+        if key is not None:
+            _inflight[key] = future
+    future.add_done_callback(lambda f: _finished(key, f))
+    return future
+
+
+def gather_within(tasks, deadline, on_late=None, group=None):
+    """Run {name: callable} concurrently; return {name: result} done within deadline.
+
+    Failed tasks are logged and left out of the result.
+    """
+    started = time.monotonic()
+    futures = {}
+    skipped = []
+    for name, fn in tasks.items():
+        future = _submit(group, name, fn)
+        if future is None:
+            skipped.append(name)
+        else:
+            futures[name] = future
+    if skipped:
+        print(f"⚠️  Fan-out pool full ({FANOUT_MAX_PENDING} pending), skipped: {', '.join(map(str, skipped))}")
+
+    names = {future: name for name, future in futures.items()}
+    done, pending = concurrent.futures.wait(names.keys(), timeout=deadline)
+
+    results = {}
+    for future in done:
+        name = names[future]
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            print(f"❌ {name} failed: {e}")
+
+    for future in pending:
+        if on_late is not None:
+            future.add_done_callback(lambda f, name=names[future]: _deliver_late(name, f, on_late))
+
+    if pending:
+        late = ', '.join(sorted(str(names[f]) for f in pending))
+        print(f"⏱️  Fan-out deadline {deadline}s hit after {time.monotonic() - started:.2f}s, skipped: {late}")
+    return results
+
+
+def _deliver_late(name, future, on_late):
+    if future.cancelled() or future.exception() is not None:
+        return
+    try:
+        on_late(name, future.result())
+    except Exception as e:
+        print(f"⚠️  Late result handler failed for {name}: {e}")
+
+
+def fan_out(tasks, deadline=0.8, on_late=None, group=None):
+    """Synchronous entry point for Flask views.
+
+    group: share in-flight tasks by name with other fan-outs in the same
+    group; only use it when equal names always mean the same fetch.
+    """
+    if not tasks:
+        return {}
+    return gather_within(tasks, deadline, on_late=on_late, group=group)
+
+
+def fan_out_list(tasks, deadline=0.8, on_late=None, group=None):
+    """Like fan_out, but concatenate the list results in task order"""
+    results = fan_out(tasks, deadline, on_late=on_late, group=group)
+    combined = []
+    for name in tasks:
+        combined.extend(results.get(name) or [])
+    return combined
@@ -0,0 +1,184 @@
+"""
+Background meme ingestion for MemeMaster.
+
+Each upstream source is refreshed on its own schedule by a single scheduler
+thread and a small persistent worker pool. Results land in an in-process
+feed cache so request handlers only ever read memory.
+"""
+
+import threading
+import time
+import random
+import concurrent.futures
+
+
+class SourceState:
+    """Last-good snapshot and freshness bookkeeping for one source"""
+
+    def __init__(self, name, fetch, interval):
+        self.name = name
+        self.fetch = fetch
+        self.interval = interval
+        self.memes = []
+        self.last_success = None
+        self.last_attempt = None
+        self.last_error = None
+        self.failures = 0
+        self.next_run = 0.0
+        self.running = False
+
+
+class MemeIngestor:
+    """Refreshes registered sources in the background into a shared cache"""
+
+    def __init__(self, max_workers=4, max_backoff=600, merge=None):
+        self.sources = {}
+        self.max_workers = max_workers
+        self.max_backoff = max_backoff
+        # Optional merge([(name, memes), ...]) -> feed, e.g. cross-source de-duplication
+        self.merge = merge
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._ready = threading.Event()
+        self._started = False
+        self._executor = None
+        self._version = 0
+        self._feed = []
+
+    def add_source(self, name, fetch, interval=120):
+        """Register a fetch function returning a list of meme dicts"""
+        self.sources[name] = SourceState(name, fetch, interval)
+
+    def start(self):
+        """Start the scheduler thread (safe to call on every request)"""
+        if self._started:
+            return
+        with self._lock:
+            if self._started:
+                return
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix='meme-ingest'
+            )
+            thread = threading.Thread(target=self._run, name='meme-ingest-scheduler', daemon=True)
+            thread.start()
+            self._started = True
+            print(f"🔄 Meme ingestion started for {len(self.sources)} sources")
+
+    def wait_ready(self, timeout):
+        """Block until the first source has produced memes or timeout elapses"""
+        return self._ready.wait(timeout)
+
+    def refresh_now(self, name=None):
+        """Mark one (or every) source as due and wake the scheduler"""
+        with self._lock:
+            for state in self.sources.values():
+                if name is None or state.name == name:
+                    state.next_run = 0.0
+        self._wakeup.set()
+
+    def offer(self, name, memes):
+        """Accept memes for a source fetched outside the scheduler (e.g. a cold-start fan-out)"""
+        if not memes or name not in self.sources:
+            return
+        with self._lock:
+            state = self.sources[name]
+            state.memes = memes
+            state.last_success = time.time()
+            state.last_error = None
+            state.failures = 0
+            self._rebuild_feed()
+        self._ready.set()
+
+    def snapshot(self):
+        """Return the combined last-good feed (a list shared by reference)"""
+        return self._feed
+
+    def versioned_snapshot(self):
+        """Return (version, feed) read together, for caches keyed by version"""
+        with self._lock:
+            return self._version, self._feed
+
+    @property
+    def version(self):
+        return self._version
+
+    def status(self):
+        """Per-source freshness, suitable for a JSON health endpoint"""
+        now = time.time()
+        result = {}
+        with self._lock:
+            for state in self.sources.values():
+                result[state.name] = {
+                    'count': len(state.memes),
+                    'interval': state.interval,
+                    'age_seconds': round(now - state.last_success, 1) if state.last_success else None,
+                    'last_success': state.last_success,
+                    'last_attempt': state.last_attempt,
+                    'last_error': state.last_error,
+                    'consecutive_failures': state.failures,
+                    'stale': state.last_success is None or now - state.last_success > state.interval * 3,
+                }
+        return result
+
+    def _run(self):
+        while True:
+            now = time.time()
+            next_due = now + 60
+            with self._lock:
+                for state in self.sources.values():
+                    if state.running:
+                        continue
+                    if state.next_run <= now:
+                        state.running = True
+                        state.last_attempt = now
+                        self._executor.submit(self._refresh, state)
+                    else:
+                        next_due = min(next_due, state.next_run)
+            self._wakeup.wait(max(0.05, next_due - time.time()))
+            self._wakeup.clear()
+
+    def _refresh(self, state):
+        memes = None
+        error = None
+        try:
+            memes = state.fetch()
+            if not memes:
+                error = 'source returned no memes'
+        except Exception as e:
+            error = str(e)
+
+        with self._lock:
+            state.running = False
+            now = time.time()
+            if error is None:
+                state.memes = memes
+                state.last_success = now
+                state.last_error = None
+                state.failures = 0
+                # Small jitter keeps sources from synchronising their refreshes
+                state.next_run = now + state.interval * random.uniform(0.9, 1.1)
+                self._rebuild_feed()
+            else:
+                # Keep serving the last-good snapshot, retry with backoff
+                state.last_error = error
+                state.failures += 1
+                backoff = min(self.max_backoff, state.interval * (2 ** (state.failures - 1)) / 4)
+                state.next_run = now + max(5, backoff)
+
+        if error is None:
+            print(f"✅ Ingested {state.name}: {len(memes)} memes")
+            self._ready.set()
+        else:
+            print(f"❌ Ingest {state.name} failed ({state.failures}x): {error}")
+        self._wakeup.set()
+
+    def _rebuild_feed(self):
+        # Called with the lock held; readers keep their old list reference
+        if self.merge is not None:
+            feed = self.merge([(state.name, state.memes) for state in self.sources.values()])
+        else:
+            feed = []
+            for state in self.sources.values():
+                feed.extend(state.memes)
+        self._feed = feed
+        self._version += 1
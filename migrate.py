@@ -0,0 +1,99 @@
+"""
+Migration: bring any older database up to the current schema, in order.
+
+1. Creates missing tables.
+2. Adds the user_memes columns the app maps (image_key, full_key,
+   thumb_key, phash) so the community feed works right away.
+3. Backfills them: moves legacy base64 images into the media store,
+   transcodes image variants and computes perceptual hashes (the last two
+   are skipped with a warning if Pillow/NumPy are missing).
+4. Creates missing indexes, and gives rows without a timestamp a fixed old
+   one so cursor pagination (which skips NULL timestamps) lists them last.
+5. Fills the leaderboard summary table from raw scores and upvotes if it
+   is empty (rebuild_leaderboard.py), so a fresh deploy has a leaderboard.
+
+This runs the same steps as migrate_media_storage.py,
+migrate_image_variants.py, migrate_phash.py, add_indexes.py and
+rebuild_leaderboard.py, which still work on their own. Safe to run more
+than once; run it after every deploy on PythonAnywhere console (or
+locally), then reload the web app.
+"""
+
+import os
+import sys
+from datetime import datetime
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db, image_pipeline, Favorite, UserMeme, Comment, LeaderboardStat, QuizScore, Upvote, LEADERBOARD_KEEP_DAYS
+from perceptual_hash import PHASH_AVAILABLE
+from migrate_media_storage import add_image_key_column, move_images_to_store
+from migrate_image_variants import add_variant_columns, backfill_variants
+from migrate_phash import add_phash_column, backfill_hashes
+from add_indexes import remove_duplicate_favorites, create_indexes
+from rebuild_leaderboard import rebuild
+
+# Paginated tables and their cursor timestamp column
+PAGINATED_TIMESTAMPS = ((Favorite, Favorite.saved_at), (UserMeme, UserMeme.created_at), (Comment, Comment.created_at))
+NULL_TIMESTAMP_FILL = datetime(1970, 1, 1)
+
+
+def fill_null_timestamps():
+    filled = 0
+    for model, column in PAGINATED_TIMESTAMPS:
+        filled += model.query.filter(column.is_(None)).update({column: NULL_TIMESTAMP_FILL}, synchronize_session=False)
+    db.session.commit()
+    return filled
+
+
+def migrate():
+    db.create_all()
+    print("✅ Tables created (existing tables untouched)")
+
+    # Columns first: cheap, and the app gates the community feature on them
+    add_image_key_column()
+    add_variant_columns()
+    add_phash_column()
+
+    moved, failed = move_images_to_store()
+    print(f"✅ Moved {moved} legacy images to the media store ({failed} skipped)")
+
+    if image_pipeline.enabled:
+        processed, failed = backfill_variants()
+        print(f"✅ Transcoded {processed} memes ({failed} skipped)")
+    else:
+        print("⚠️  Pillow not installed; skipping image variants")
+
+    if PHASH_AVAILABLE:
+        hashed, failed = backfill_hashes()
+        print(f"✅ Hashed {hashed} memes ({failed} skipped)")
+    else:
+        print("⚠️  NumPy/Pillow not installed; skipping perceptual hashes")
+
+    remove_duplicate_favorites()
+    created = create_indexes()
+    print(f"✅ Created {created} indexes")
+    print(f"✅ Filled {fill_null_timestamps()} missing timestamps")
+
+    if LeaderboardStat.query.first() is None and (QuizScore.query.first() or Upvote.query.first()):
+        rows = rebuild(LEADERBOARD_KEEP_DAYS)
+        print(f"✅ Leaderboard rebuilt ({rows} rows)")
+    else:
+        print("   Leaderboard summary already populated")
+
+
+if __name__ == '__main__':
+    print("=" * 50)
+    print("Database Migration")
+    print("=" * 50)
+
+    with app.app_context():
+        try:
+            migrate()
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Migration failed: {e}")
+            sys.exit(1)
+
+    print("\n✅ Migration complete! Reload the web app to pick up the new schema.")
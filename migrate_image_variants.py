@@ -0,0 +1,82 @@
+"""
+Migration: add compressed full-size and thumbnail variants for user memes.
+
+1. Adds user_memes.full_key and user_memes.thumb_key if they are missing.
+2. Transcodes every stored meme that doesn't have variants yet.
+
+Run migrate_media_storage.py first so legacy rows have an image_key.
+Safe to run more than once. Run this on PythonAnywhere console or locally.
+"""
+
+import os
+import sys
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db, UserMeme, image_pipeline
+
+BATCH_SIZE = 20
+
+
+def add_variant_columns():
+    """Add the variant key columns using raw SQL (create_all won't alter tables)"""
+    columns = [c['name'] for c in db.inspect(db.engine).get_columns('user_memes')]
+    for column in ('full_key', 'thumb_key'):
+        if column in columns:
+            print(f"✅ user_memes.{column} already exists")
+            continue
+        db.session.execute(db.text(f"ALTER TABLE user_memes ADD COLUMN {column} VARCHAR(100)"))
+        db.session.commit()
+        print(f"✅ Added user_memes.{column}")
+
+
+def backfill_variants():
+    """Transcode stored memes in batches; the pipeline callback saves the keys"""
+    processed = 0
+    failed = 0
+    last_id = 0
+
+    while True:
+        rows = db.session.query(UserMeme.id, UserMeme.image_key).filter(
+            UserMeme.id > last_id,
+            UserMeme.image_key.isnot(None),
+            UserMeme.thumb_key.is_(None)
+        ).order_by(UserMeme.id).limit(BATCH_SIZE).all()
+
+        if not rows:
+            break
+
+        for meme_id, image_key in rows:
+            last_id = meme_id
+            try:
+                image_pipeline.process(meme_id, image_key)
+                processed += 1
+            except Exception as e:
+                print(f"⚠️  Meme {meme_id}: {e}, skipping")
+                failed += 1
+
+        print(f"   ...processed {processed} memes so far")
+
+    return processed, failed
+
+
+if __name__ == '__main__':
+    print("=" * 50)
+    print("User Meme Image Variants Migration")
+    print("=" * 50)
+
+    if not image_pipeline.enabled:
+        print("❌ Pillow is not installed. Run: pip install -r requirements.txt")
+        sys.exit(1)
+
+    with app.app_context():
+        try:
+            add_variant_columns()
+            processed, failed = backfill_variants()
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Migration failed: {e}")
+            sys.exit(1)
+
+    print(f"\n✅ Migration complete! Processed {processed} memes ({failed} skipped)")
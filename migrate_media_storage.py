@@ -0,0 +1,87 @@
+"""
+Migration: move user-posted meme images out of the user_memes table.
+
+1. Adds the user_memes.image_key column if it is missing.
+2. Decodes every legacy base64 data URL in image_data, writes the bytes to
+   the media store and keeps only the key in the row.
+
+Safe to run more than once; rows that already have an image_key are skipped.
+Run this on PythonAnywhere console or locally.
+"""
+
+import os
+import sys
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db, UserMeme, media_store
+from media_store import decode_data_url, MediaError
+
+BATCH_SIZE = 50
+
+
+def add_image_key_column():
+    """Add user_memes.image_key using raw SQL (create_all won't alter tables)"""
+    columns = [c['name'] for c in db.inspect(db.engine).get_columns('user_memes')]
+    if 'image_key' in columns:
+        print("✅ user_memes.image_key already exists")
+        return
+
+    db.session.execute(db.text("ALTER TABLE user_memes ADD COLUMN image_key VARCHAR(100)"))
+    db.session.commit()
+    print("✅ Added user_memes.image_key")
+
+
+def move_images_to_store():
+    """Convert legacy base64 rows into media store keys, in batches"""
+    moved = 0
+    failed = 0
+    last_id = 0
+
+    while True:
+        # Select explicit columns so this works before later migrations add theirs
+        rows = db.session.query(UserMeme.id, UserMeme.image_data).filter(
+            UserMeme.id > last_id,
+            UserMeme.image_key.is_(None)
+        ).order_by(UserMeme.id).limit(BATCH_SIZE).all()
+
+        if not rows:
+            break
+
+        for meme_id, image_data in rows:
+            last_id = meme_id
+            try:
+                image_bytes, content_type = decode_data_url(image_data)
+            except MediaError as e:
+                print(f"⚠️  Meme {meme_id}: {e}, skipping")
+                failed += 1
+                continue
+
+            UserMeme.query.filter_by(id=meme_id).update({
+                UserMeme.image_key: media_store.put(image_bytes, content_type),
+                UserMeme.image_data: ''
+            })
+            moved += 1
+
+        db.session.commit()
+        print(f"   ...moved {moved} images so far")
+
+    return moved, failed
+
+
+if __name__ == '__main__':
+    print("=" * 50)
+    print("User Meme Media Storage Migration")
+    print("=" * 50)
+
+    with app.app_context():
+        try:
+            add_image_key_column()
+            moved, failed = move_images_to_store()
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Migration failed: {e}")
+            sys.exit(1)
+
+    print(f"\n✅ Migration complete! Moved {moved} images ({failed} skipped)")
@@ -0,0 +1,89 @@
+"""
+Migration: perceptual hashes for user-posted memes.
+
+1. Adds the user_memes.phash column if it is missing.
+2. Computes the pHash of every stored meme that doesn't have one yet, so
+   new uploads can be checked against them for near-duplicates.
+
+Run migrate_media_storage.py first so legacy rows have an image_key, and
+add_indexes.py afterwards for the user_memes.image_key index.
+Safe to run more than once. Run this on PythonAnywhere console or locally.
+"""
+
+import os
+import sys
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db, UserMeme, media_store
+from perceptual_hash import compute_hashes, PHASH_AVAILABLE
+
+BATCH_SIZE = 50
+
+
+def add_phash_column():
+    """Add user_memes.phash using raw SQL (create_all won't alter tables)"""
+    columns = [c['name'] for c in db.inspect(db.engine).get_columns('user_memes')]
+    if 'phash' in columns:
+        print("✅ user_memes.phash already exists")
+        return
+
+    db.session.execute(db.text("ALTER TABLE user_memes ADD COLUMN phash VARCHAR(16)"))
+    db.session.commit()
+    print("✅ Added user_memes.phash")
+
+
+def backfill_hashes():
+    """Hash stored memes in batches"""
+    hashed = 0
+    failed = 0
+    last_id = 0
+
+    while True:
+        rows = db.session.query(UserMeme.id, UserMeme.image_key).filter(
+            UserMeme.id > last_id,
+            UserMeme.image_key.isnot(None),
+            UserMeme.phash.is_(None)
+        ).order_by(UserMeme.id).limit(BATCH_SIZE).all()
+
+        if not rows:
+            break
+
+        for meme_id, image_key in rows:
+            last_id = meme_id
+            try:
+                phash = compute_hashes(media_store.read(image_key))['phash']
+            except Exception as e:
+                print(f"⚠️  Meme {meme_id}: {e}, skipping")
+                failed += 1
+                continue
+
+            UserMeme.query.filter_by(id=meme_id).update({UserMeme.phash: phash})
+            hashed += 1
+
+        db.session.commit()
+        print(f"   ...hashed {hashed} memes so far")
+
+    return hashed, failed
+
+
+if __name__ == '__main__':
+    print("=" * 50)
+    print("User Meme Perceptual Hash Migration")
+    print("=" * 50)
+
+    if not PHASH_AVAILABLE:
+        print("❌ NumPy/Pillow are not installed. Run: pip install -r requirements.txt")
+        sys.exit(1)
+
+    with app.app_context():
+        try:
+            add_phash_column()
+            hashed, failed = backfill_hashes()
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Migration failed: {e}")
+            sys.exit(1)
+
+    print(f"\n✅ Migration complete! Hashed {hashed} memes ({failed} skipped)")
@@ -0,0 +1,185 @@
+"""
+Perceptual hashing for near-duplicate meme detection.
+
+Reposts are often re-encoded, resized or re-hosted copies of the same
+image, so their bytes and URLs differ. Three 64-bit perceptual hashes are
+computed with NumPy (average, difference and DCT-based pHash); images whose
+pHashes differ in only a few bits are treated as the same meme. Hashing is
+CPU-bound, so it runs in a small process pool, and lookups go through a
+BK-tree so finding near matches doesn't compare against every stored hash.
+
+NumPy and Pillow are optional: without them hashing is disabled.
+"""
+
+import io
+import threading
+import multiprocessing
+import concurrent.futures
+
+try:
+    import numpy as np
+    from PIL import Image
+    PHASH_AVAILABLE = True
+except ImportError:
+    PHASH_AVAILABLE = False
+
+HASH_BITS = 8  # 8x8 = 64-bit hashes
+DCT_SIZE = 32
+NEAR_DUPLICATE_DISTANCE = 6  # Max differing pHash bits for "same meme"
+
+_dct_matrix = None
+
+
+def _dct(n):
+    """Orthonormal DCT-II matrix, built once"""
+    global _dct_matrix
+    if _dct_matrix is None:
+        k = np.arange(n)[:, None]
+        i = np.arange(n)[None, :]
+        matrix = np.sqrt(2.0 / n) * np.cos(np.pi * (2 * i + 1) * k / (2 * n))
+        matrix[0, :] = np.sqrt(1.0 / n)
+        _dct_matrix = matrix
+    return _dct_matrix
+
+
+def _to_hex(bits):
+    """Pack a boolean array of 64 bits into a 16-character hex string"""
+    return np.packbits(bits.ravel().astype(np.uint8)).tobytes().hex()
+
+
+def _gray(image, width, height):
+    return np.asarray(image.resize((width, height), Image.LANCZOS), dtype=np.float32)
+
+
+def average_hash(image):
+    pixels = _gray(image, HASH_BITS, HASH_BITS)
+    return _to_hex(pixels > pixels.mean())
+
+
+def difference_hash(image):
+    pixels = _gray(image, HASH_BITS + 1, HASH_BITS)
+    return _to_hex(pixels[:, 1:] > pixels[:, :-1])
+
+
+def perceptual_hash(image):
+    pixels = _gray(image, DCT_SIZE, DCT_SIZE)
+    dct = _dct(DCT_SIZE)
+    coefficients = (dct @ pixels @ dct.T)[:HASH_BITS, :HASH_BITS]
+    # The DC term only tracks overall brightness, so leave it out of the median
+    median = np.median(coefficients.ravel()[1:])
+    return _to_hex(coefficients > median)
+
+
+def compute_hashes(image_bytes):
+    """Return {'ahash', 'dhash', 'phash'} hex strings for an encoded image"""
+    with Image.open(io.BytesIO(image_bytes)) as source:
+        source.draft('L', (DCT_SIZE * 4, DCT_SIZE * 4))  # Cheap JPEG downscale on decode
+        image = source.convert('L')
+    return {
+        'ahash': average_hash(image),
+        'dhash': difference_hash(image),
+        'phash': perceptual_hash(image),
+    }
+
+
+def hamming(a, b):
+    """Number of differing bits between two hex hashes"""
+    return bin(int(a, 16) ^ int(b, 16)).count('1')
+
+
+class BKTree:
+    """Burkhard-Keller tree over 64-bit hashes for Hamming-radius search"""
+
+    def __init__(self):
+        self._root = None  # [hash_int, [values], {distance: child}]
+        self.size = 0
+
+    def add(self, hash_hex, value):
+        h = int(hash_hex, 16)
+        self.size += 1
+        if self._root is None:
+            self._root = [h, [value], {}]
+            return
+        node = self._root
+        while True:
+            distance = bin(h ^ node[0]).count('1')
+            if distance == 0:
+                node[1].append(value)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [h, [value], {}]
+                return
+            node = child
+
+    def search(self, hash_hex, max_distance=NEAR_DUPLICATE_DISTANCE):
+        """Return [(distance, value)] within max_distance, closest first"""
+        if self._root is None:
+            return []
+        h = int(hash_hex, 16)
+        found = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            distance = bin(h ^ node[0]).count('1')
+            if distance <= max_distance:
+                found.extend((distance, value) for value in node[1])
+            # Triangle inequality: only subtrees in [d - r, d + r] can match
+            for child_distance, child in node[2].items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        found.sort(key=lambda item: item[0])
+        return found
+
+    def __len__(self):
+        return self.size
+
+
+class HashPool:
+    """Computes hashes in worker processes, created lazily (after gunicorn forks)"""
+
+    def __init__(self, max_workers=2):
+        self.max_workers = max_workers
+        self.enabled = PHASH_AVAILABLE
+        self._executor = None
+        self._lock = threading.Lock()
+        if not self.enabled:
+            print("⚠️  NumPy/Pillow not installed; perceptual hashing is disabled")
+
+    @staticmethod
+    def _context():
+        # Forking a threaded web worker can copy held locks into the child; start clean instead
+        try:
+            context = multiprocessing.get_context('forkserver')
+            context.set_forkserver_preload([__name__])
+            return context
+        except ValueError:
+            return multiprocessing.get_context('spawn')
+
+    def _pool(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = concurrent.futures.ProcessPoolExecutor(
+                        max_workers=self.max_workers, mp_context=self._context()
+                    )
+        return self._executor
+
+    def submit(self, image_bytes):
+        return self._pool().submit(compute_hashes, image_bytes)
+
+    def hash(self, image_bytes, timeout=None):
+        """Hashes for one image, or None if disabled, undecodable or too slow"""
+        if not self.enabled:
+            return None
+        try:
+            return self.submit(image_bytes).result(timeout)
+        except concurrent.futures.BrokenExecutor:
+            # A crashed worker poisons the pool; start a fresh one next time
+            with self._lock:
+                self._executor = None
+            return None
+        except Exception as e:
+            print(f"⚠️  Perceptual hash failed: {e}")
+            return None
+
@@ -0,0 +1,319 @@
+"""
+On-disk LRU byte cache for the media proxies.
+
+Upstream bodies are streamed to the client and teed into a temp file at
+the same time; only a complete, in-budget download is promoted into the
+cache. Cached objects are plain files, so the proxy routes can serve them
+with send_file() and get Range (206) and ETag/If-None-Match handling for
+free. The least recently used objects are evicted once the cache grows
+past max_bytes.
+
+Several workers can share one cache directory. A worker that misses its
+own index checks the directory before going upstream. Promotions evict
+from the worker's own index; every rescan_interval seconds it rescans the
+directory under a lock file and trims it, so max_bytes is the budget for
+all of them together (recency is the files' mtime, touched on every hit),
+give or take one interval's worth of downloads. The rescan also removes
+.part files left behind by crashed downloads. fcntl is optional: without
+it (Windows) run a single worker per directory.
+"""
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+
+def parse_range(header, size):
+    """(start, end) for a single 'bytes=' range, None to send the whole file,
+    or 'unsatisfiable'"""
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    first, _, last = header[6:].strip().partition('-')
+    try:
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        elif last:
+            start, end = max(0, size - int(last)), size - 1
+        else:
+            return None
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        return 'unsatisfiable'
+    return start, end
+
+
+def slice_chunks(chunks, start, end):
+    """Yield bytes start..end (inclusive) of a chunk stream, then read it to the end.
+
+    Reading past the range lets a tee() underneath finish and cache the
+    whole object while the client only receives the part it asked for.
+    """
+    position = 0
+    for chunk in chunks:
+        chunk_end = position + len(chunk)
+        if chunk_end > start and position <= end:
+            yield chunk[max(0, start - position):end + 1 - position]
+        position = chunk_end
+
+
+class CacheEntry:
+    """A cached upstream object"""
+
+    def __init__(self, path, content_type, size, etag):
+        self.path = path
+        self.content_type = content_type
+        self.size = size
+        self.etag = etag
+
+
+class CacheWriter:
+    """Accumulates one upstream body in a temp file.
+
+    commit() only promotes the copy into the cache if it matched
+    expected_size (when known) and stayed under max_object_bytes;
+    abort() throws it away and is a no-op after commit().
+    """
+
+    def __init__(self, cache, url, content_type, expected_size):
+        self.cache = cache
+        self.url = url
+        self.content_type = content_type
+        self.expected_size = expected_size
+        self.size = 0
+        fd, self.tmp_path = tempfile.mkstemp(dir=cache.root, suffix='.part')
+        self._file = os.fdopen(fd, 'wb')
+        self._caching = True
+
+    def write(self, chunk):
+        if not self._caching:
+            return
+        self.size += len(chunk)
+        if self.size > self.cache.max_object_bytes:
+            self._caching = False  # Too big to cache; the caller keeps streaming
+            self._file.close()
+        else:
+            self._file.write(chunk)
+
+    def commit(self):
+        if self.tmp_path is None:
+            return
+        self._file.close()
+        if self._caching and (self.expected_size is None or self.size == self.expected_size):
+            self.cache._promote(self.cache._key(self.url), self.tmp_path, self.url, self.content_type, self.size)
+            self.tmp_path = None
+        else:
+            self.abort()
+
+    def abort(self):
+        if self.tmp_path is None:
+            return
+        self._file.close()
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
+        self.tmp_path = None
+
+
+class ProxyCache:
+    """Size-capped LRU cache of upstream response bodies, keyed by URL"""
+
+    # Temp files older than this belong to a download that died
+    PART_MAX_AGE = 3600
+
+    def __init__(self, root, max_bytes, max_object_bytes, rescan_interval=60):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_object_bytes = max_object_bytes
+        self.rescan_interval = rescan_interval
+        self._lock = threading.Lock()
+        self._index = OrderedDict()  # key -> size, least recently used first
+        self._total = 0
+        self._scanned_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(root, exist_ok=True)
+        self._rescan()  # Loads the index from what is already on disk
+
+    def _key(self, url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _paths(self, key):
+        return os.path.join(self.root, key + '.bin'), os.path.join(self.root, key + '.json')
+
+    def _scan(self):
+        """(mtime, key, size) for every cached object on disk, oldest first.
+
+        Also deletes stale .part files.
+        """
+        found = []
+        stale_before = time.time() - self.PART_MAX_AGE
+        for name in os.listdir(self.root):
+            if not name.endswith(('.bin', '.part')):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                stat = os.stat(path)
+                if name.endswith('.part'):
+                    if stat.st_mtime < stale_before:
+                        os.remove(path)
+                    continue
+            except OSError:
+                continue
+            found.append((stat.st_mtime, name[:-4], stat.st_size))
+        return sorted(found)
+
+    @contextmanager
+    def _disk_lock(self):
+        """Exclusive across processes sharing root (a no-op without fcntl)"""
+        if not FCNTL_AVAILABLE:
+            yield
+            return
+        with open(os.path.join(self.root, '.lock'), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def get(self, url):
+        """Return a CacheEntry for url, or None on a miss"""
+        key = self._key(url)
+        data_path, meta_path = self._paths(key)
+        with self._lock:
+            known = key in self._index
+            if known:
+                self._index.move_to_end(key)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            os.utime(data_path)
+        except (OSError, ValueError):
+            # Not on disk (or evicted by another worker)
+            if known:
+                self._forget(key)
+            with self._lock:
+                self.misses += 1
+            return None
+        if not known:
+            # Cached by another worker sharing this directory
+            with self._lock:
+                if key not in self._index:
+                    self._index[key] = meta['size']
+                    self._total += meta['size']
+        with self._lock:
+            self.hits += 1
+        return CacheEntry(data_path, meta['content_type'], meta['size'], meta['etag'])
+
+    def writer(self, url, content_type, expected_size=None):
+        """Open a CacheWriter for url, or None if it is known to be too big"""
+        if expected_size is not None and expected_size > self.max_object_bytes:
+            return None
+        return CacheWriter(self, url, content_type, expected_size)
+
+    def tee(self, url, chunks, content_type, expected_size=None):
+        """Yield chunks through unchanged while caching them"""
+        writer = self.writer(url, content_type, expected_size)
+        if writer is None:
+            yield from chunks
+            return
+
+        try:
+            for chunk in chunks:
+                writer.write(chunk)
+                yield chunk
+            writer.commit()
+        finally:
+            writer.abort()
+
+    def _promote(self, key, tmp_path, url, content_type, size):
+        data_path, meta_path = self._paths(key)
+        stored_at = time.time()
+        meta = {
+            'url': url,
+            'content_type': content_type,
+            'size': size,
+            'etag': f'{key[:24]}-{size:x}-{int(stored_at):x}',
+            'stored_at': stored_at,
+        }
+        meta_tmp = meta_path + '.part'
+        with open(meta_tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, data_path)
+        os.replace(meta_tmp, meta_path)
+
+        with self._lock:
+            self._total -= self._index.pop(key, 0)
+            self._index[key] = size
+            self._total += size
+        if time.monotonic() - self._scanned_at > self.rescan_interval:
+            self._rescan()
+        else:
+            self._evict()
+
+    def _evict(self):
+        """Drop least recently used objects until this worker's view fits max_bytes"""
+        while True:
+            with self._lock:
+                if self._total <= self.max_bytes or not self._index:
+                    return
+                key, size = self._index.popitem(last=False)
+                self._total -= size
+                self.evictions += 1
+            self._remove_files(key)
+
+    def _rescan(self):
+        """Trim the shared directory to max_bytes and resync the index from it"""
+        self._scanned_at = time.monotonic()
+        with self._disk_lock():
+            found = self._scan()
+            total = sum(size for _, _, size in found)
+            evicted = 0
+            for _, key, size in found:
+                if total <= self.max_bytes:
+                    break
+                self._remove_files(key)
+                total -= size
+                evicted += 1
+        with self._lock:
+            self._index = OrderedDict((key, size) for _, key, size in found[evicted:])
+            self._total = total
+            self.evictions += evicted
+
+    def _forget(self, key):
+        with self._lock:
+            self._total -= self._index.pop(key, 0)
+        self._remove_files(key)
+
+    def _remove_files(self, key):
+        # Open file handles (in-flight send_file responses) keep working on POSIX
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                'objects': len(self._index),
+                'bytes': self._total,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,114 @@
+"""
+Concurrency governor for the media proxy routes.
+
+Every proxied upstream fetch takes a slot before it starts and gives it
+back when the response finishes streaming. Slots are limited globally and
+per upstream host, so slow media hosts can only tie up a bounded number
+of worker threads and the quiz and feed APIs keep theirs. Requests that
+can't get a slot wait in a short, bounded queue; once the queue is full
+or the wait runs out they are rejected straight away with GovernorBusy
+(which the routes turn into a 503 with Retry-After).
+
+Limits are per process: with gunicorn, size them against --threads.
+"""
+
+import threading
+import time
+from collections import defaultdict
+
+
+class GovernorBusy(Exception):
+    """No proxy slot became available in time"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+class ProxySlot:
+    """A held slot; release() is idempotent so it can be wired to several exit paths"""
+
+    def __init__(self, governor, host):
+        self._governor = governor
+        self.host = host
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._governor._release(self.host)
+
+
+class ConcurrencyGovernor:
+    """Global and per-host in-flight limits with a bounded wait queue"""
+
+    def __init__(self, max_inflight=4, max_per_host=2, max_queue=4, max_wait=2.0):
+        self.max_inflight = max_inflight
+        self.max_per_host = max_per_host
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._inflight = 0
+        self._per_host = defaultdict(int)
+        self._waiting = 0
+        self.peak_waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.total_wait = 0.0
+
+    def _has_room(self, host):
+        return self._inflight < self.max_inflight and self._per_host[host] < self.max_per_host
+
+    def acquire(self, host):
+        """Take a slot for host, waiting up to max_wait; raises GovernorBusy"""
+        started = time.monotonic()
+        with self._cond:
+            if not self._has_room(host):
+                if self._waiting >= self.max_queue:
+                    self.rejected += 1
+                    raise GovernorBusy('proxy queue full', retry_after=max(1, int(self.max_wait)))
+
+                self._waiting += 1
+                self.peak_waiting = max(self.peak_waiting, self._waiting)
+                try:
+                    deadline = started + self.max_wait
+                    while not self._has_room(host):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.timed_out += 1
+                            raise GovernorBusy('timed out waiting for a proxy slot',
+                                               retry_after=max(1, int(self.max_wait)))
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            self._inflight += 1
+            self._per_host[host] += 1
+            self.admitted += 1
+            self.total_wait += time.monotonic() - started
+        return ProxySlot(self, host)
+
+    def _release(self, host):
+        with self._cond:
+            self._inflight -= 1
+            self._per_host[host] -= 1
+            if self._per_host[host] <= 0:
+                del self._per_host[host]
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'inflight': self._inflight,
+                'max_inflight': self.max_inflight,
+                'per_host': dict(self._per_host),
+                'max_per_host': self.max_per_host,
+                'queue_depth': self._waiting,
+                'peak_queue_depth': self.peak_waiting,
+                'max_queue': self.max_queue,
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'avg_wait_ms': round(1000 * self.total_wait / self.admitted, 1) if self.admitted else 0,
+            }
@@ -0,0 +1,167 @@
+"""
+Pre-warmed quiz question pool.
+
+Each quiz category keeps an in-memory queue of memes that a background
+refiller tops up in bulk whenever it drops below a low watermark. Serving a
+question is a queue pop, and a bounded per-session seen-set makes sure a
+player never gets the same meme twice.
+"""
+
+import threading
+import random
+import time
+import concurrent.futures
+from collections import deque, OrderedDict
+
+
+class QuizQuestionPool:
+    """Per-category meme queues refilled in bulk by a background thread"""
+
+    def __init__(self, categories, fetch_batch, batch_size=50, low_watermark=15,
+                 max_per_category=150, session_memory=300, max_sessions=5000, refill_workers=4):
+        self.categories = categories
+        self.fetch_batch = fetch_batch
+        self.batch_size = batch_size
+        self.low_watermark = low_watermark
+        self.session_memory = session_memory
+        self.max_sessions = max_sessions
+        self.refill_workers = refill_workers
+        self._fresh = {c: deque() for c in categories}
+        # Recently served memes, reused if a category runs dry while upstream is down
+        self._spent = {c: deque(maxlen=max_per_category) for c in categories}
+        self._known = {c: set() for c in categories}
+        self._max_per_category = max_per_category
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._restocked = threading.Condition(self._lock)
+        self._refill_needed = threading.Event()
+        self._started = False
+
+    def start(self):
+        """Start the background refiller (safe to call on every request)"""
+        if self._started:
+            return
+        with self._lock:
+            if self._started:
+                return
+            thread = threading.Thread(target=self._run, name='quiz-pool-refiller', daemon=True)
+            thread.start()
+            self._started = True
+            self._refill_needed.set()
+
+    def next_question(self, session_key, timeout=0):
+        """Return (category, post) unseen by this session.
+
+        If nothing is available, wait up to timeout seconds for the refiller
+        before giving up and returning None.
+        """
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            seen = self._session_seen(session_key)
+            while True:
+                picked = self._pick(seen)
+                if picked is not None:
+                    return picked
+                self._refill_needed.set()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._restocked.wait(remaining)
+
+    def _pick(self, seen):
+        stocked = [c for c in self.categories if self._fresh[c] or self._spent[c]]
+        random.shuffle(stocked)
+
+        for category in stocked:
+            post = self._take(category, seen)
+            if post is not None:
+                self._remember(seen, post['id'])
+                if len(self._fresh[category]) < self.low_watermark:
+                    self._refill_needed.set()
+                return category, post
+        return None
+
+    def stats(self):
+        with self._lock:
+            return {
+                c: {'fresh': len(self._fresh[c]), 'spent': len(self._spent[c])}
+                for c in self.categories
+            }
+
+    def _take(self, category, seen):
+        fresh = self._fresh[category]
+        # Skip past anything this player has already seen, keeping it for others
+        for _ in range(len(fresh)):
+            post = fresh.popleft()
+            self._spent[category].append(post)
+            if post['id'] not in seen[0]:
+                return post
+        for post in self._spent[category]:
+            if post['id'] not in seen[0]:
+                return post
+        return None
+
+    def _session_seen(self, session_key):
+        seen = self._sessions.get(session_key)
+        if seen is None:
+            seen = (set(), deque())
+            self._sessions[session_key] = seen
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_key)
+        return seen
+
+    def _remember(self, seen, post_id):
+        ids, order = seen
+        ids.add(post_id)
+        order.append(post_id)
+        while len(order) > self.session_memory:
+            ids.discard(order.popleft())
+
+    def _run(self):
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.refill_workers, thread_name_prefix='quiz-pool-fetch'
+        )
+        while True:
+            self._refill_needed.wait(60)
+            self._refill_needed.clear()
+            with self._lock:
+                low = [c for c in self.categories if len(self._fresh[c]) < self.low_watermark]
+            if not low:
+                continue
+            total = 0
+            for category, posts in zip(low, executor.map(self._fetch, low)):
+                added = self._add(category, posts)
+                total += added
+                if added:
+                    print(f"🧠 Quiz pool {category}: +{added} ({len(self._fresh[category])} ready)")
+            if not total:
+                # Upstream is failing or has nothing new; don't hammer it
+                time.sleep(5)
+
+    def _fetch(self, category):
+        subreddit = random.choice(self.categories[category])
+        try:
+            return self.fetch_batch(subreddit, self.batch_size)
+        except Exception as e:
+            print(f"Quiz pool refill error ({subreddit}): {e}")
+            return []
+
+    def _add(self, category, posts):
+        added = 0
+        with self._lock:
+            known = self._known[category]
+            fresh = self._fresh[category]
+            for post in posts:
+                if post['id'] in known or len(fresh) >= self._max_per_category:
+                    continue
+                known.add(post['id'])
+                fresh.append(post)
+                added += 1
+            # Forget ids that have aged out of both queues so the set stays bounded
+            if len(known) > self._max_per_category * 4:
+                self._known[category] = {p['id'] for p in fresh} | {p['id'] for p in self._spent[category]}
+            if added:
+                self._restocked.notify_all()
+        return added
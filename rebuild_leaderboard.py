@@ -0,0 +1,90 @@
+"""
+Rebuild the leaderboard_stats summary table from raw quiz scores and upvotes.
+
+The app keeps leaderboard_stats up to date incrementally. Run this once after
+deploying the summary table (to backfill history), or any time the totals
+need to be recomputed from scratch; migrate.py runs it automatically when
+the table is empty. Daily and weekly rows older than --keep-days
+(LEADERBOARD_KEEP_DAYS) are dropped; the app prunes them daily after that.
+
+Usage:
+    python rebuild_leaderboard.py [--keep-days 60]
+"""
+
+import os
+import sys
+import argparse
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+# Add the parent directory to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db, QuizScore, Upvote, UserMeme, LeaderboardStat, LEADERBOARD_WINDOWS, LEADERBOARD_KEEP_DAYS, leaderboard_period
+
+
+def score_rows_query():
+    return db.session.query(QuizScore.user_email, QuizScore.score, QuizScore.created_at)
+
+
+def upvote_rows_query():
+    """(meme author, vote time) for every upvote"""
+    return db.session.query(UserMeme.user_email, Upvote.created_at).join(Upvote, Upvote.meme_id == UserMeme.id)
+
+
+def rebuild(keep_days):
+    cutoff = datetime.utcnow() - timedelta(days=keep_days)
+    # (user_email, period) -> [best_score, total_upvotes]
+    totals = defaultdict(lambda: [0, 0])
+
+    def periods(when):
+        for window in LEADERBOARD_WINDOWS:
+            if window == 'all' or (when and when >= cutoff):
+                yield leaderboard_period(window, when)
+
+    print("Scanning quiz scores...")
+    for user_email, score, created_at in score_rows_query().yield_per(1000):
+        for period in periods(created_at):
+            row = totals[(user_email, period)]
+            row[0] = max(row[0], score or 0)
+
+    print("Scanning upvotes...")
+    for author_email, created_at in upvote_rows_query().yield_per(1000):
+        for period in periods(created_at):
+            totals[(author_email, period)][1] += 1
+
+    print(f"Writing {len(totals)} summary rows...")
+    LeaderboardStat.query.delete()
+    db.session.bulk_insert_mappings(LeaderboardStat, [
+        {
+            'user_email': user_email,
+            'period': period,
+            'best_score': best_score,
+            'total_upvotes': total_upvotes,
+            'updated_at': datetime.utcnow(),
+        }
+        for (user_email, period), (best_score, total_upvotes) in totals.items()
+    ])
+    db.session.commit()
+    return len(totals)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rebuild leaderboard_stats from raw tables')
+    parser.add_argument('--keep-days', type=int, default=LEADERBOARD_KEEP_DAYS, help='days of daily/weekly rows to keep')
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("Leaderboard Rebuild")
+    print("=" * 50)
+
+    with app.app_context():
+        try:
+            db.create_all()
+            rows = rebuild(args.keep_days)
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Rebuild failed: {e}")
+            sys.exit(1)
+
+    print(f"\n✅ Leaderboard rebuilt ({rows} rows)")
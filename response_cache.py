@@ -0,0 +1,156 @@
+"""
+HTTP response cache for read-mostly JSON endpoints.
+
+Every cached endpoint declares the resources it reads ('user_memes',
+'comments:{meme_id}', ...). Writes bump those resources' version counters,
+which changes the cache key, so the next GET re-renders. Rendered bodies
+are kept for a short TTL; other workers don't see this worker's bumps, so
+the TTL bounds how stale they can be.
+
+ETags are computed over the serialized body, which keeps them identical
+across workers, and conditional requests are answered with 304. They are
+weak, since the body may be sent compressed. Public
+responses carry Cache-Control with s-maxage so a CDN can absorb polling;
+responses that depend on the logged-in user are marked private. Endpoints
+whose readers expect to see their own writes (comments) are sent no-cache,
+so every read revalidates and costs a 304 at most; a reload on those
+(request Cache-Control: no-cache) re-renders, since the write may have
+been bumped on another worker.
+"""
+
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from flask import request, make_response
+
+
+class _Rendered:
+    __slots__ = ('body', 'etag', 'mimetype', 'headers', 'stored_at')
+
+    def __init__(self, body, etag, mimetype, headers):
+        self.body = body
+        self.etag = etag
+        self.mimetype = mimetype
+        self.headers = headers
+        self.stored_at = time.monotonic()
+
+
+class ResponseCache:
+    """Version-keyed, LRU-bounded cache of rendered GET responses"""
+
+    # Response headers worth replaying from a cached render
+    KEPT_HEADERS = ('X-Next-Cursor', 'Link')
+
+    def __init__(self, ttl=5, max_entries=512):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._versions = {}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def bump(self, *resources):
+        """Invalidate everything rendered from these resources"""
+        with self._lock:
+            for resource in resources:
+                self._versions[resource] = self._versions.get(resource, 0) + 1
+
+    def version(self, resource):
+        return self._versions.get(resource, 0)
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry.stored_at > self.ttl:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def cached(self, resources, max_age=0, s_maxage=None, vary=None, no_cache=False):
+        """Decorator for GET views.
+
+        resources: names read by the view, formatted with the view kwargs
+        ('comments:{meme_id}'). vary: optional callable returning a
+        per-user key (or None for anonymous); keyed responses are private.
+        no_cache: browsers and CDNs must revalidate (by ETag) before reuse,
+        and a reload skips this worker's render too.
+        """
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if request.method != 'GET':
+                    return view(*args, **kwargs)
+
+                names = [resource.format(**kwargs) for resource in resources]
+                user_key = vary() if vary else None
+                key = (
+                    request.endpoint,
+                    request.full_path,
+                    user_key,
+                    tuple(self.version(name) for name in names)
+                )
+
+                entry = None if no_cache and request.cache_control.no_cache else self._lookup(key)
+                if entry is None:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200 or response.direct_passthrough:
+                        return response
+                    body = response.get_data()
+                    entry = _Rendered(
+                        body,
+                        hashlib.sha256(body).hexdigest()[:20],
+                        response.mimetype,
+                        [(name, response.headers[name]) for name in self.KEPT_HEADERS if name in response.headers]
+                    )
+                    self._store(key, entry)
+
+                response = make_response(entry.body)
+                response.mimetype = entry.mimetype
+                for name, value in entry.headers:
+                    response.headers[name] = value
+                # Weak: the compression middleware may re-encode the body, and a
+                # weak validator reads the same on the 200 and on its 304s
+                response.set_etag(entry.etag, weak=True)
+                if vary:
+                    # Anonymous and signed-in renders share a URL
+                    response.vary.add('Cookie')
+                if user_key is not None:
+                    response.headers['Cache-Control'] = 'private, no-cache'
+                elif no_cache:
+                    response.headers['Cache-Control'] = 'public, no-cache'
+                else:
+                    directives = ['public', f'max-age={max_age}']
+                    if s_maxage is not None:
+                        directives.append(f's-maxage={s_maxage}')
+                    response.headers['Cache-Control'] = ', '.join(directives)
+
+                response = response.make_conditional(request)
+                if response.status_code == 304:
+                    self.not_modified += 1
+                return response
+            return wrapper
+        return decorator
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'resources': len(self._versions),
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+            }
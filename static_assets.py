@@ -0,0 +1,118 @@
+"""
+In-memory manifest of the static files the app is allowed to serve.
+
+The static directory is scanned once at startup; every file gets an entry
+with its size, mtime, MIME type and ETag, plus any precompressed .br/.gz
+siblings written by build_assets.py. A request for a static path is then a
+dict lookup: unknown paths 404 without touching the filesystem, and known
+ones are served from the recorded metadata without a stat() per request.
+
+Files are only picked up at startup, so reload the app after deploying.
+"""
+
+import hashlib
+import mimetypes
+import os
+from datetime import datetime, timezone
+
+from werkzeug.http import is_resource_modified
+from werkzeug.wsgi import wrap_file
+
+from compression import COMPRESSIBLE_TYPES
+
+# Precompressed variants, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+COMPRESSED_SUFFIXES = tuple(suffix for _, suffix in ENCODINGS)
+
+# Never exposed even if they end up in the static directory
+HIDDEN_SUFFIXES = ('.py', '.pyc', '.db', '.sqlite', '.env', '.json')
+
+
+class StaticFile:
+    """Metadata for one servable file (or one encoded variant of it)"""
+
+    __slots__ = ('path', 'size', 'mtime', 'etag', 'mimetype', 'variants')
+
+    def __init__(self, path, mimetype):
+        stat = os.stat(path)
+        self.path = path
+        self.size = stat.st_size
+        self.mtime = datetime.fromtimestamp(int(stat.st_mtime), tz=timezone.utc)
+        self.mimetype = mimetype
+        with open(path, 'rb') as f:
+            self.etag = hashlib.sha256(f.read()).hexdigest()[:16]
+        self.variants = {}  # encoding -> StaticFile
+
+
+class StaticManifest:
+    """Maps URL paths (relative, '/'-separated) to StaticFile entries"""
+
+    def __init__(self, root):
+        self.root = root
+        self.files = {}
+        self.scan()
+
+    def scan(self):
+        files = {}
+        if os.path.isdir(self.root):
+            for directory, dirnames, filenames in os.walk(self.root):
+                dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+                for name in filenames:
+                    if name.startswith('.') or name.endswith(HIDDEN_SUFFIXES + COMPRESSED_SUFFIXES):
+                        continue
+                    path = os.path.join(directory, name)
+                    relative = os.path.relpath(path, self.root).replace(os.sep, '/')
+                    mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+                    entry = StaticFile(path, mimetype)
+                    for encoding, suffix in ENCODINGS:
+                        if os.path.isfile(path + suffix):
+                            entry.variants[encoding] = StaticFile(path + suffix, mimetype)
+                    files[relative] = entry
+        self.files = files
+        return len(files)
+
+    def get(self, path):
+        return self.files.get(path)
+
+    def __contains__(self, path):
+        return path in self.files
+
+    def __len__(self):
+        return len(self.files)
+
+    def stats(self):
+        return {
+            'root': self.root,
+            'files': len(self.files),
+            'bytes': sum(entry.size for entry in self.files.values()),
+            'precompressed': sum(1 for entry in self.files.values() if entry.variants),
+        }
+
+
+def serve_file(entry, request, response_class, cache_control):
+    """Build a conditional (304/Range aware) response for a manifest entry"""
+    served, encoding = entry, None
+    for candidate, _ in ENCODINGS:
+        variant = entry.variants.get(candidate)
+        if variant is not None and candidate in request.accept_encodings:
+            served, encoding = variant, candidate
+            break
+
+    etag = served.etag + ('-' + encoding if encoding else '')
+    if is_resource_modified(request.environ, etag=etag, last_modified=served.mtime):
+        body = wrap_file(request.environ, open(served.path, 'rb'))
+    else:
+        body = None  # 304 below; don't open the file at all
+    response = response_class(body, mimetype=entry.mimetype, direct_passthrough=True)
+    response.content_length = served.size
+    response.last_modified = served.mtime
+    # Each encoding is a different representation, so it needs its own ETag.
+    # An unencoded compressible file may still be compressed on the fly, so
+    # its ETag is weak on both the 200 and its 304s.
+    response.set_etag(etag, weak=encoding is None and entry.mimetype.startswith(COMPRESSIBLE_TYPES))
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if entry.variants:
+        response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = cache_control
+    return response.make_conditional(request, accept_ranges=True, complete_length=served.size)
@@ -0,0 +1,132 @@
+"""
+Bounded stale-while-revalidate cache for upstream API responses.
+
+Entries younger than the soft TTL are served as-is. Between the soft and
+hard TTL the stale value is served immediately while one background refresh
+runs. Past the hard TTL (or on a miss) callers load synchronously, but
+concurrent callers for the same key share a single upstream request.
+"""
+
+import threading
+import time
+import concurrent.futures
+from collections import OrderedDict
+
+
+class _Entry:
+    __slots__ = ('value', 'stored_at', 'soft_ttl', 'hard_ttl')
+
+    def __init__(self, value, soft_ttl, hard_ttl):
+        self.value = value
+        self.stored_at = time.monotonic()
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = hard_ttl
+
+    def age(self):
+        return time.monotonic() - self.stored_at
+
+
+class SWRCache:
+    """LRU-bounded TTL cache with stale-while-revalidate and single-flight loads"""
+
+    def __init__(self, max_entries=256, refresh_workers=4):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=refresh_workers, thread_name_prefix='swr-refresh'
+        )
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def get(self, key, loader, soft_ttl=60, hard_ttl=300):
+        """Return the cached value for key, calling loader() to (re)fill it.
+
+        Loader exceptions propagate to synchronous callers and are never cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = entry.age()
+                if age < entry.hard_ttl:
+                    self._entries.move_to_end(key)
+                    if age < entry.soft_ttl:
+                        self.hits += 1
+                    else:
+                        self.stale_hits += 1
+                        if key not in self._inflight:
+                            self._inflight[key] = self._executor.submit(
+                                self._load, key, loader, soft_ttl, hard_ttl
+                            )
+                    return entry.value
+                del self._entries[key]
+
+            self.misses += 1
+            future = self._inflight.get(key)
+            if future is None:
+                future = concurrent.futures.Future()
+                self._inflight[key] = future
+                owner = True
+            else:
+                owner = False
+
+        if owner:
+            try:
+                future.set_result(self._load(key, loader, soft_ttl, hard_ttl))
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+    def refresh(self, key, loader, soft_ttl=60, hard_ttl=300):
+        """Load key now whatever its age and store the result (joins a load already in flight)"""
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = concurrent.futures.Future()
+                self._inflight[key] = future
+
+        if owner:
+            try:
+                future.set_result(self._load(key, loader, soft_ttl, hard_ttl))
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything when key is None"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'refreshing': len(self._inflight),
+            }
+
+    def _load(self, key, loader, soft_ttl, hard_ttl):
+        try:
+            value = loader()
+            with self._lock:
+                self._entries[key] = _Entry(value, soft_ttl, hard_ttl)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return value
+        except Exception as e:
+            # Failed background refreshes keep serving the stale value until hard TTL
+            print(f"⚠️  Cache refresh failed for {key}: {e}")
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
@@ -0,0 +1,143 @@
+"""
+Regression tests for the media proxy cache: a client that only ever sends
+Range requests (as <video>/<audio> elements do) still fills the cache, so
+its second request is served locally.
+
+Upstream is faked, so no network is needed:
+    python -m pytest test_proxy_cache.py
+"""
+import asyncio
+import os
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+import pytest
+
+import app as app_module
+from proxy_cache import ProxyCache
+
+BODY = bytes(range(256)) * 1024  # 256 KiB
+URL = 'https://v.redd.it/example/DASH_AUDIO_128.mp4'
+
+
+class FakeUpstream:
+    """Stands in for a requests streaming response; honours Range like a CDN"""
+
+    def __init__(self, headers):
+        range_header = headers.get('Range')
+        if range_header:
+            first, _, last = range_header[6:].partition('-')
+            start, end = int(first), int(last) if last else len(BODY) - 1
+            self.body = BODY[start:end + 1]
+            self.status_code = 206
+            self.headers = {'Content-Type': 'audio/mp4', 'Content-Length': str(len(self.body)),
+                            'Content-Range': f'bytes {start}-{end}/{len(BODY)}'}
+        else:
+            self.body = BODY
+            self.status_code = 200
+            self.headers = {'Content-Type': 'audio/mp4', 'Content-Length': str(len(BODY))}
+
+    def iter_content(self, chunk_size=8192):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def proxy(tmp_path, monkeypatch):
+    requests = []
+
+    def fake_http_get(url, source='default', headers=None, **kwargs):
+        requests.append(dict(headers or {}))
+        return FakeUpstream(headers or {})
+
+    cache = ProxyCache(str(tmp_path), max_bytes=10 * 1024 * 1024, max_object_bytes=1024 * 1024)
+    monkeypatch.setattr(app_module, 'proxy_cache', cache)
+    monkeypatch.setattr(app_module, 'http_get', fake_http_get)
+    return app_module.app.test_client(), cache, requests
+
+
+def test_range_miss_fills_cache(proxy):
+    client, cache, requests = proxy
+
+    first = client.get('/api/proxy-audio', query_string={'url': URL}, headers={'Range': 'bytes=0-'})
+    assert first.status_code == 206
+    assert first.headers['X-Proxy-Cache'] == 'MISS'
+    assert first.get_data() == BODY
+    assert 'Range' not in requests[0]  # Whole object fetched so it could be cached
+
+    second = client.get('/api/proxy-audio', query_string={'url': URL}, headers={'Range': 'bytes=1000-1999'})
+    assert second.status_code == 206
+    assert second.headers['X-Proxy-Cache'] == 'HIT'
+    assert second.headers['Content-Range'] == f'bytes 1000-1999/{len(BODY)}'
+    assert second.get_data() == BODY[1000:2000]
+    assert len(requests) == 1
+
+
+def test_mid_file_range_miss_sends_only_the_range(proxy):
+    client, cache, requests = proxy
+
+    response = client.get('/api/proxy-audio', query_string={'url': URL}, headers={'Range': 'bytes=5000-5099'})
+    assert response.status_code == 206
+    assert response.headers['Content-Length'] == '100'
+    assert response.get_data() == BODY[5000:5100]
+    assert cache.get(URL) is not None
+
+
+def test_range_miss_too_big_to_cache_is_forwarded(proxy):
+    client, cache, requests = proxy
+    cache.max_object_bytes = 1024
+
+    response = client.get('/api/proxy-audio', query_string={'url': URL}, headers={'Range': 'bytes=0-99'})
+    assert response.status_code == 206
+    assert response.get_data() == BODY[:100]
+    assert requests[-1]['Range'] == 'bytes=0-99'
+    assert cache.get(URL) is None
+
+
+def test_asgi_range_miss_fills_cache(tmp_path, monkeypatch):
+    httpx = pytest.importorskip('httpx')
+    pytest.importorskip('asgiref')
+    import asgi
+
+    def upstream(request):
+        fake = FakeUpstream({'Range': request.headers['range']} if 'range' in request.headers else {})
+        return httpx.Response(fake.status_code, headers=fake.headers, stream=httpx.ByteStream(fake.body))
+
+    cache = ProxyCache(str(tmp_path), max_bytes=10 * 1024 * 1024, max_object_bytes=1024 * 1024)
+    monkeypatch.setattr(asgi, 'proxy_cache', cache)
+
+    async def run():
+        monkeypatch.setattr(asgi, '_client', httpx.AsyncClient(transport=httpx.MockTransport(upstream)))
+        transport = httpx.ASGITransport(app=asgi.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://testserver') as client:
+            first = await client.get('/api/proxy-audio', params={'url': URL}, headers={'Range': 'bytes=0-'})
+            second = await client.get('/api/proxy-audio', params={'url': URL}, headers={'Range': 'bytes=10-19'})
+        await asgi._client.aclose()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first.status_code == 206 and first.headers['x-proxy-cache'] == 'MISS'
+    assert first.content == BODY
+    assert second.status_code == 206 and second.headers['x-proxy-cache'] == 'HIT'
+    assert second.content == BODY[10:20]
+
+
+def test_promote_does_not_rescan_and_rescan_drops_stale_parts(tmp_path, monkeypatch):
+    stale = tmp_path / 'crashed.part'
+    stale.write_bytes(b'x')
+    os.utime(stale, (0, 0))
+    cache = ProxyCache(str(tmp_path), max_bytes=3000, max_object_bytes=2000)
+    assert not stale.exists()
+
+    scans = []
+    real_listdir = os.listdir
+    monkeypatch.setattr(os, 'listdir', lambda path: scans.append(path) or real_listdir(path))
+    for i in range(3):
+        list(cache.tee(f'https://example.com/{i}', [b'y' * 1000], 'video/mp4', 1000))
+    list(cache.tee('https://example.com/3', [b'y' * 1000], 'video/mp4', 1000))
+    assert scans == []
+    assert cache.stats()['bytes'] <= 3000
+    assert cache.get('https://example.com/0') is None  # Least recently used went first
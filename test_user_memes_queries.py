@@ -0,0 +1,154 @@
+"""
+Regression tests for /api/user-memes: a constant number of queries no
+matter how many memes, comments and upvotes there are (no N+1), cursor
+pagination that visits every meme exactly once, and ETag revalidation
+(including comments, which must show a poster their own comment).
+
+Runs against an in-memory SQLite database:
+    python -m pytest test_user_memes_queries.py
+"""
+import os
+from datetime import datetime
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from sqlalchemy import event
+
+from app import app, db, User, UserMeme, Comment, Upvote, response_cache
+
+MAX_QUERIES = 8
+
+
+def seed(meme_count):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add(User(email='viewer@example.com', name='Viewer'))
+        db.session.add(User(email='author@example.com', name='Author'))
+        for i in range(meme_count):
+            meme = UserMeme(user_email='author@example.com', title=f'Meme {i}', image_key=None, image_data='x')
+            db.session.add(meme)
+            db.session.flush()
+            db.session.add(Comment(user_email='viewer@example.com', meme_id=meme.id, content='lol'))
+            if i % 2 == 0:
+                db.session.add(Upvote(user_email='viewer@example.com', meme_id=meme.id))
+        db.session.commit()
+    # Seeding bypasses the write routes, so invalidate cached feeds by hand
+    response_cache.bump('user_memes')
+
+
+def count_feed_queries():
+    app.config['SESSION_COOKIE_SECURE'] = False
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = 'viewer@example.com'
+        session['user_email'] = 'viewer@example.com'
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.get('/api/user-memes')
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    return response.get_json(), statements
+
+
+def test_user_memes_query_count_is_constant():
+    seed(3)
+    small_feed, small_queries = count_feed_queries()
+
+    seed(40)
+    large_feed, large_queries = count_feed_queries()
+
+    assert len(small_feed) == 3
+    assert len(large_feed) == 40
+    assert len(large_queries) == len(small_queries), large_queries
+    assert len(large_queries) <= MAX_QUERIES, large_queries
+
+
+def test_user_memes_counts_and_upvotes_are_correct():
+    seed(4)
+    feed, _ = count_feed_queries()
+
+    by_title = {meme['title']: meme for meme in feed}
+    assert by_title['Meme 0']['has_upvoted'] is True
+    assert by_title['Meme 1']['has_upvoted'] is False
+    assert all(meme['comment_count'] == 1 for meme in feed)
+    assert all(meme['author'] == 'Author' for meme in feed)
+
+
+def test_user_memes_cursor_pagination_walks_every_meme_once():
+    seed(40)
+    with app.app_context():
+        # Identical timestamps exercise the id tie-breaker in the cursor
+        UserMeme.query.update({UserMeme.created_at: datetime(2024, 1, 1)})
+        db.session.commit()
+
+    client = app.test_client()
+    seen = []
+    url = '/api/user-memes?limit=15'
+    while url:
+        response = client.get(url)
+        seen.extend(meme['id'] for meme in response.get_json())
+        cursor = response.headers.get('X-Next-Cursor')
+        url = f'/api/user-memes?limit=15&cursor={cursor}' if cursor else None
+
+    assert len(seen) == 40
+    assert seen == sorted(set(seen), reverse=True)
+    assert client.get('/api/user-memes?cursor=not-a-cursor').status_code == 400
+
+
+def test_user_memes_revalidates_until_a_write():
+    seed(3)
+    client = app.test_client()
+    response = client.get('/api/user-memes')
+    etag = response.headers['ETag']
+
+    assert client.get('/api/user-memes', headers={'If-None-Match': etag}).status_code == 304
+
+    app.config['SESSION_COOKIE_SECURE'] = False
+    with client.session_transaction() as session:
+        session['_user_id'] = 'viewer@example.com'
+        session['user_email'] = 'viewer@example.com'
+    meme_id = response.get_json()[0]['id']
+    assert client.post(f'/api/memes/{meme_id}/comments', json={'content': 'again'}).status_code == 200
+
+    # Signed in (so private) and re-rendered with the new comment count
+    response = client.get('/api/user-memes', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+    assert response.get_json()[0]['comment_count'] == 2
+
+
+def test_comments_revalidate_and_reload_sees_other_workers_writes():
+    seed(1)
+    client = app.test_client()
+    with app.app_context():
+        meme_id = UserMeme.query.first().id
+    url = f'/api/memes/{meme_id}/comments'
+    response = client.get(url)
+    assert response.headers['Cache-Control'] == 'public, no-cache'
+    assert client.get(url, headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+    # Written through another worker, so this worker's version was never bumped
+    with app.app_context():
+        db.session.add(Comment(user_email='viewer@example.com', meme_id=meme_id, content='elsewhere'))
+        db.session.commit()
+    assert len(client.get(url).get_json()) == 1
+    assert len(client.get(url, headers={'Cache-Control': 'no-cache'}).get_json()) == 2
+
+
+if __name__ == '__main__':
+    test_user_memes_query_count_is_constant()
+    test_user_memes_counts_and_upvotes_are_correct()
+    test_user_memes_cursor_pagination_walks_every_meme_once()
+    test_user_memes_revalidates_until_a_write()
+    test_comments_revalidate_and_reload_sees_other_workers_writes()
+    print("✅ /api/user-memes regression tests passed")
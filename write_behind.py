@@ -0,0 +1,153 @@
+"""
+Write-behind buffer for append-only, high-frequency database writes.
+
+Request handlers enqueue records and return immediately. A background
+thread hands them to a flush callback in batches, every interval_ms or as
+soon as max_rows records are waiting, so many requests share one bulk
+insert and one commit. Pending records are flushed at interpreter exit.
+
+When a batch fails its records are retried one at a time, so one bad
+record can't take the rest of the batch down with it; a record that keeps
+failing while others succeed is dropped after max_attempts. If nothing
+goes through, the database is assumed to be down: records are kept (up to
+max_pending, oldest dropped first) and retried with exponential backoff.
+"""
+
+import atexit
+import threading
+import time
+from collections import deque
+
+
+class WriteBehindBuffer:
+    """Batches (kind, record) pairs into periodic flush(batch) calls"""
+
+    def __init__(self, flush, max_rows=200, interval_ms=500, max_pending=10000, max_attempts=3, max_backoff=30):
+        self.flush = flush
+        self.max_rows = max_rows
+        self.interval = interval_ms / 1000.0
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.max_backoff = max_backoff
+        self._backoff = 0  # Seconds to wait after a failed flush; 0 while healthy
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._started = False
+        self.flushed = 0
+        self.dropped = 0
+        self.flushes = 0
+
+    def start(self):
+        """Start the flusher thread (safe to call on every request)"""
+        if self._started:
+            return
+        with self._lock:
+            if self._started:
+                return
+            thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+            thread.start()
+            atexit.register(self.drain)
+            self._started = True
+
+    def add(self, kind, record):
+        """Queue one record; never blocks unless the buffer is badly backed up"""
+        self.start()
+        with self._lock:
+            self._pending.append((kind, record, 0))
+            backlog = len(self._pending)
+        if backlog >= self.max_pending:
+            if not self._backoff:
+                # Backpressure: write synchronously rather than grow without bound
+                self.flush_once()
+            with self._lock:
+                while len(self._pending) > self.max_pending:
+                    self._pending.popleft()
+                    self.dropped += 1
+        elif backlog >= self.max_rows:
+            self._wakeup.set()
+
+    def drain(self):
+        """Flush everything still pending (used at shutdown)"""
+        while self._pending:
+            if not self.flush_once():
+                break
+
+    def stats(self):
+        return {
+            'pending': len(self._pending),
+            'flushed': self.flushed,
+            'flushes': self.flushes,
+            'dropped': self.dropped,
+            'backoff': self._backoff,
+        }
+
+    def _flush_each(self, batch):
+        """Retry a failed batch one record at a time; returns (failed, any_succeeded)"""
+        failed = []
+        succeeded = 0
+        for kind, record, attempts in batch:
+            try:
+                self.flush([(kind, record)])
+            except Exception as e:
+                failed.append((kind, record, attempts, e))
+            else:
+                succeeded += 1
+        self.flushed += succeeded
+        return failed, succeeded > 0
+
+    def flush_once(self):
+        """Flush up to max_rows records; returns False if any record failed"""
+        with self._flush_lock:
+            with self._lock:
+                batch = [self._pending.popleft() for _ in range(min(self.max_rows, len(self._pending)))]
+            if not batch:
+                return True
+
+            try:
+                self.flush([(kind, record) for kind, record, _ in batch])
+            except Exception as e:
+                print(f"⚠️  Write-behind flush of {len(batch)} records failed, retrying one by one: {e}")
+                failed, database_up = self._flush_each(batch)
+                if not failed:
+                    self.flushes += 1
+                    self._backoff = 0
+                    return True
+
+                retry = []
+                for kind, record, attempts, error in failed:
+                    if database_up or attempts:
+                        # Other records went through (now or before), so this one is the problem
+                        attempts += 1
+                        if attempts >= self.max_attempts:
+                            self.dropped += 1
+                            print(f"❌ Write-behind dropped a {kind} record after {attempts} attempts: {error}")
+                            continue
+                    retry.append((kind, record, attempts))
+                with self._lock:
+                    self._pending.extendleft(reversed(retry))
+
+                if database_up:
+                    self._backoff = 0
+                else:
+                    # Looks like an outage: keep everything and back off
+                    self._backoff = min(self.max_backoff, max(self.interval, self._backoff * 2))
+                return False
+
+            self.flushed += len(batch)
+            self.flushes += 1
+            self._backoff = 0
+            return True
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            while self._pending:
+                if not self.flush_once():
+                    # Give the database a moment before retrying
+                    time.sleep(self._backoff or self.interval)
+                    break
+                if len(self._pending) < self.max_rows:
+                    break